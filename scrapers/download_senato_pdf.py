@@ -3,184 +3,632 @@
 download_senato_pdf.py - v13.0 "SIMPLE AND CORRECT"
 ===================================================
 Logica corretta e semplice:
-1. Test anni: SEMPRE con BASE_TEMPLATE per legislature passate
+1. Test anni: SEMPRE con l'URL della legislatura (/legislature/XX/...) per legislature passate
 2. Legislatura attuale: anno fine = anno corrente, anno inizio = fine precedente + 1
 3. Cartelle semplici: solo legislatura_XX senza sottocartelle anni
 """
 from __future__ import annotations
 import argparse
+import atexit
+import bisect
 import datetime as dt
 import json
+import logging
+import logging.handlers
+import os
+import queue
 import random
 import re
+import shutil
+import sqlite3
 import sys
+import threading
 import time
+from collections import Counter
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed
+from email.utils import parsedate_to_datetime
 from pathlib import Path
-from typing import List, Optional, Tuple, Set, Dict
-from urllib.parse import urljoin
+from threading import Lock
+from typing import BinaryIO, Iterator, List, Optional, Tuple, Set, Dict
+from urllib.parse import urljoin, urlsplit
 
 import requests
-from bs4 import BeautifulSoup
+from lxml import etree, html as lh
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
 
 # Config
-DELAY_HTML = 2.0
-DELAY_PDF = 2.0  
-JITTER_HTML = 1.5
-JITTER_PDF = 1.0
+HTML_RATE = 0.5      # Pagine HTML al secondo, totali su tutti i worker
+HTML_BURST = 2       # Richieste HTML consecutive consentite prima del throttling
+PDF_RATE = 1.0       # Download PDF avviati al secondo, totali su tutti i worker
+PDF_BURST = 3
 RETRIES = 3
+PROBE_WORKERS = 4    # Anni testati in parallelo in fase di scoperta
+YEAR_WORKERS = 3     # Pagine elenco (anni) scaricate in parallelo
+PDF_WORKERS = 3      # Download PDF in parallelo
+PROBE_BYTES = 32 * 1024
+HTML_CACHE_TTL = 600   # Secondi di validità di una pagina elenco già scaricata nel run
+PDF_CHUNK_SIZE = 1 << 20   # 1 MiB per iterazione invece di 8 KiB
+PROCESSED_DB = ".processed.sqlite"
+PROCESSED_COMMIT_EVERY = 50   # commit dell'indice ogni N file registrati
+LEGISLATURE_CACHE = Path("~/.cache/ws-orchestrator/senato_legislature.json").expanduser()
+LEGISLATURE_CACHE_TTL = 30 * 86400   # Dopo 30 giorni i range delle legislature si verificano di nuovo
+MANIFEST_NAME = "manifest.jsonl"   # Un record metadata per PDF, una riga per file
 TIMEOUT_HTML = 3
 TIMEOUT_PDF = 3
-BACKOFF = 20
+BACKOFF_FACTOR = 2.0
+FORBIDDEN_PAUSE = 30
+FORBIDDEN_JITTER = 15
+MAX_PER_HOST = 4        # Connessioni contemporanee verso lo stesso host, su tutti i pool
+MAX_RETRY_AFTER = 300   # Tetto alla pausa richiesta dal server con Retry-After
+
+BASE_URL = "https://www.senato.it"
+LISTING_PATH = "/lavori/assemblea/resoconti-elenco-cronologico?year="
+
+# Calendario noto delle legislature repubblicane (anno inizio, anno fine; None = in corso)
+LEGISLATURE_CALENDAR = {
+    "1": (1948, 1953), "2": (1953, 1958), "3": (1958, 1963), "4": (1963, 1968),
+    "5": (1968, 1972), "6": (1972, 1976), "7": (1976, 1979), "8": (1979, 1983),
+    "9": (1983, 1987), "10": (1987, 1992), "11": (1992, 1994), "12": (1994, 1996),
+    "13": (1996, 2001), "14": (2001, 2006), "15": (2006, 2008), "16": (2008, 2013),
+    "17": (2013, 2018), "18": (2018, 2022), "19": (2022, None),
+}
+
+MESI = {
+    'gennaio': '01', 'febbraio': '02', 'marzo': '03', 'aprile': '04',
+    'maggio': '05', 'giugno': '06', 'luglio': '07', 'agosto': '08',
+    'settembre': '09', 'ottobre': '10', 'novembre': '11', 'dicembre': '12'
+}
+# Parola generica al posto dell'alternanza dei 12 mesi: il mese si verifica su MESI.
+# Niente \b ai bordi: il testo delle celle adiacenti arriva concatenato ("2024Resoconto")
+_DATE_RE = re.compile(r'(\d{1,2})\s+([A-Za-zà-ù]+)\s+(\d{4})')
+
+
+_find_dates = _DATE_RE.finditer
+
+# Pattern "N legislatura" nel testo della pagina (XIX = 19)
+_LEG_TEXT_PATTERNS = [
+    (re.compile(r'XIX\s+legislatura', re.IGNORECASE), None),
+    (re.compile(r'(\d+)ª?\s+legislatura', re.IGNORECASE), 1),
+    (re.compile(r'Legislatura\s+(\d+)', re.IGNORECASE), 1),
+]
+
 
-BASE_TEMPLATE = "https://www.senato.it/legislature/{leg}/lavori/assemblea/resoconti-elenco-cronologico?year={year}"
-BASE_TEMPLATE_ATTUALE = "https://www.senato.it/lavori/assemblea/resoconti-elenco-cronologico?year={year}"
+def _listing_url(leg: Optional[str], year: int) -> str:
+    """URL dell'elenco resoconti di un anno; leg=None per il template della legislatura attuale"""
+    if leg is None:
+        return f"{BASE_URL}{LISTING_PATH}{year}"
+    return f"{BASE_URL}/legislature/{leg}{LISTING_PATH}{year}"
+
+
+def _abs(href: str) -> str:
+    """URL assoluto sul sito del Senato: concatenazione per i casi semplici, urljoin per gli altri"""
+    if href.startswith("//"):
+        return "https:" + href  # Protocol-relative
+    if ".." in href:
+        return urljoin(BASE_URL + "/", href)  # Segmenti ../ da normalizzare
+    if href.startswith("http"):
+        return href
+    return BASE_URL + (href if href.startswith("/") else "/" + href)
+
+
+# XPath compilati una volta sola: niente parsing dell'espressione a ogni pagina/anchor
+_PDF_COUNT_XPATH = etree.XPath('count(//a[substring(@href, string-length(@href) - 3) = ".pdf"])')
+# Elementi genitori dei nodi di testo che nominano la legislatura: il numero può stare in un
+# tag figlio ("Legislatura <span>XIX</span>", "<b>19</b>ª legislatura")
+_LEG_TEXT_XPATH = etree.XPath(
+    '//text()[contains(translate(., "LEGISATUR", "legisatur"), "legislatura")]/..'
+)
+# Testo del genitore e poi del nonno dell'anchor, qualunque sia il tag (tr, li, p, div, td, span...);
+# il nonno vale solo se contiene quel solo link PDF (altrimenti è il contenitore dell'elenco)
+_PARENT_TEXT_XPATH = etree.XPath('string(..)')
+_GRANDPARENT_TEXT_XPATH = etree.XPath('string(../..)')
+_GRANDPARENT_PDFS_XPATH = etree.XPath('count(../..//a[substring(@href, string-length(@href) - 3) = ".pdf"])')
+
+
+def _iter_pdf_anchors(tree) -> Iterator[Tuple[lh.HtmlElement, str]]:
+    """Coppie (anchor, href) dei link a PDF della pagina, in ordine di documento"""
+    for a in tree.iter("a"):
+        href = a.get("href")
+        if href and href.endswith(".pdf"):
+            yield a, href
+
+
+def extract_italian_date(text: str) -> Optional[str]:
+    """Prima data italiana ("5 marzo 2024") nel testo, in formato ISO"""
+    for match in _find_dates(text):
+        month = MESI.get(match.group(2).lower())
+        if month is None:
+            continue
+        return f"{match.group(3)}-{month}-{match.group(1).zfill(2)}"
+    return None
 
 HEADERS = {
     "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36",
     "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
-    "Accept-Language": "it-IT,it;q=0.9,en;q=0.8"
+    "Accept-Language": "it-IT,it;q=0.9,en;q=0.8",
+    "Accept-Encoding": "gzip, deflate",
 }
 
-session = requests.Session()
-session.headers.update(HEADERS)
+# Logging bufferizzato: formattazione e scrittura su stdout avvengono nel thread del listener
+_log_queue: "queue.Queue[logging.LogRecord]" = queue.Queue(-1)
+_log_listener = logging.handlers.QueueListener(_log_queue, logging.StreamHandler(sys.stdout))
+_log_listener.start()
+atexit.register(_log_listener.stop)
+
+log = logging.getLogger("senato")
+log.addHandler(logging.handlers.QueueHandler(_log_queue))
+log.setLevel(logging.INFO)
+log.propagate = False
+
+# Log per singolo file (Esiste/download/OK): --quiet li spegne nei run massivi
+file_log = logging.getLogger("senato.files")
+
+# Retry esponenziale (urllib3) al posto dello sleep fisso: gestisce anche Retry-After
+_retry = Retry(
+    total=RETRIES,
+    backoff_factor=BACKOFF_FACTOR,
+    status_forcelist=[429, 500, 502, 503, 504],
+    allowed_methods=frozenset(["GET", "HEAD"]),
+    respect_retry_after_header=True,
+)
+
+# Limite di connessioni per host condiviso da probe, elenchi e download PDF
+_host_slots: Dict[str, threading.BoundedSemaphore] = {}
+_host_slots_lock = Lock()
+
+
+def _host_slot(url: str) -> threading.BoundedSemaphore:
+    """Semaforo dell'host di url (creato al primo uso)"""
+    host = urlsplit(url).netloc
+    with _host_slots_lock:
+        slot = _host_slots.get(host)
+        if slot is None:
+            slot = _host_slots[host] = threading.BoundedSemaphore(MAX_PER_HOST)
+    return slot
+
+
+# Una Session per thread: cookie jar e pool di connessioni non sono condivisi tra i worker
+_tls = threading.local()
+
+
+def _get_session() -> requests.Session:
+    """Session keep-alive del thread corrente (creata al primo uso)"""
+    s = getattr(_tls, "session", None)
+    if s is None:
+        s = requests.Session()
+        s.headers.update(HEADERS)
+        s.headers["Connection"] = "keep-alive"
+        adapter = HTTPAdapter(pool_connections=2, pool_maxsize=4, max_retries=_retry)
+        s.mount("https://", adapter)
+        s.mount("http://", adapter)
+        _tls.session = s
+    return s
+
+
+class _RateLimiter:
+    """Token bucket thread-safe: limita il ritmo totale delle richieste, non quello del singolo worker"""
+    
+    __slots__ = ("rate", "capacity", "_tokens", "_last", "_lock")
+    
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.capacity = burst
+        self._tokens = float(burst)
+        self._last = time.monotonic()
+        self._lock = Lock()
+    
+    def acquire(self):
+        """Attende un token: i worker in coda si dividono il ritmo invece di sommare le pause"""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._last) * self.rate)
+                self._last = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+# Cortesia verso senato.it: un solo limite per tutto il processo (elenchi/probe e PDF)
+_html_limiter = _RateLimiter(HTML_RATE, HTML_BURST)
+_pdf_limiter = _RateLimiter(PDF_RATE, PDF_BURST)
 
 
 class SimpleCorrectSenatoPDFDownloader:
     """Downloader semplice e corretto per Senato"""
     
-    def __init__(self):
+    __slots__ = ("processed_files", "_in_flight", "_db", "_lock", "legislature_info", "current_legislature",
+                 "current_year", "pdf_workers", "_cache_path", "_manifests", "_listings",
+                 "_pending_commits", "_year_counts", "_html_cache", "_run_legislatures")
+    
+    # Campi metadata uguali per ogni PDF: costruiti una volta sola
+    _META_TEMPLATE = {
+        "source": "senato",
+        "document_type": "stenographic_report",
+        "institution": "senato_repubblica",
+        "language": "it",
+    }
+    
+    def __init__(self, pdf_workers: int = PDF_WORKERS, cache_path: Path = LEGISLATURE_CACHE):
         self.processed_files = set()
-        self.legislature_info = {}
+        self._in_flight: Set[str] = set()
+        self.pdf_workers = pdf_workers
+        self._db: Optional[sqlite3.Connection] = None
+        self._pending_commits = 0
+        self._lock = Lock()
+        self._manifests: Dict[Path, BinaryIO] = {}
         self.current_legislature = None
         self.current_year = dt.datetime.now().year
+        self._cache_path = cache_path
+        # Validatori HTTP (ETag/Last-Modified) e link già estratti per ogni pagina "leg/anno"
+        self._listings: Dict[str, Dict] = {}
+        # Numero di PDF per "leg/anno" già sondati: gli anni chiusi non cambiano più
+        self._year_counts: Dict[str, int] = {}
+        # Pagine elenco già scaricate (o in corso): probe anni ed estrazione link condividono lo stesso GET
+        self._html_cache: Dict[str, Tuple[float, Future]] = {}
+        self.legislature_info = self._load_legislature_cache()
+        # Legislature considerate in questo run: la cache evita i probe, non allarga la selezione
+        self._run_legislatures: Set[str] = set()
     
     def _sleep(self, base: float, jitter: float):
         time.sleep(base + random.uniform(0, jitter))
 
+    def _open_processed_db(self, dest_dir: Path):
+        """Apre l'indice persistente dei file già processati e lo carica in memoria"""
+        dest_dir.mkdir(parents=True, exist_ok=True)
+        self._db = sqlite3.connect(dest_dir / PROCESSED_DB, check_same_thread=False)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS done(file_id TEXT PRIMARY KEY, path TEXT, mtime REAL) WITHOUT ROWID"
+        )
+        self.processed_files = set(row[0] for row in self._db.execute("SELECT file_id FROM done"))
+        log.info("🗂️  File già processati (indice): %s", len(self.processed_files))
+
+    def _mark_processed(self, file_id: str, dest_path: Path):
+        """Registra un file come processato (in memoria e su disco)"""
+        with self._lock:
+            self.processed_files.add(file_id)
+            if self._db is not None:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO done(file_id, path, mtime) VALUES (?, ?, ?)",
+                    (file_id, str(dest_path), time.time())
+                )
+                # Commit a blocchi: un fsync per file rallenta i re-run con migliaia di "Esiste"
+                self._pending_commits += 1
+                if self._pending_commits >= PROCESSED_COMMIT_EVERY:
+                    self._db.commit()
+                    self._pending_commits = 0
+
+    def _close_processed_db(self):
+        """Commit delle registrazioni rimaste e chiusura dell'indice"""
+        with self._lock:
+            if self._db is not None:
+                self._db.commit()
+                self._db.close()
+                self._db = None
+            self._pending_commits = 0
+
+    def _load_legislature_cache(self) -> Dict[str, Dict]:
+        """Carica le info legislature scoperte nei run precedenti"""
+        try:
+            if self._cache_path.exists():
+                info = json.loads(self._cache_path.read_text(encoding="utf-8"))
+                file_mtime = self._cache_path.stat().st_mtime
+                # Formato attuale: {"legislature": {...}, "listings": {...}}; il vecchio ha solo le legislature
+                if "legislature" in info:
+                    self._listings = info.get("listings", {})
+                    self._year_counts = info.get("year_counts", {})
+                    info = info["legislature"]
+                # Validatori e conteggi restano validi; i range legislature scadono dopo il TTL
+                now = time.time()
+                fresh = {}
+                for leg, leg_info in info.items():
+                    if now - leg_info.get('checked_at', file_mtime) > LEGISLATURE_CACHE_TTL:
+                        continue
+                    # La legislatura corrente si ricalcola a ogni run
+                    leg_info.pop('is_current', None)
+                    fresh[leg] = leg_info
+                return fresh
+        except Exception as e:
+            log.warning("  ⚠️  Cache legislature illeggibile: %s", e)
+        return {}
+
+    def _save_legislature_cache(self):
+        """Salva le info legislature per i run successivi"""
+        try:
+            self._cache_path.parent.mkdir(parents=True, exist_ok=True)
+            with self._lock:
+                data = {"legislature": self.legislature_info, "listings": self._listings,
+                        "year_counts": self._year_counts}
+                text = json.dumps(data, ensure_ascii=False, indent=2)
+            # Scrittura atomica: un run interrotto non lascia la cache troncata
+            tmp = self._cache_path.with_suffix(".tmp")
+            tmp.write_text(text, encoding="utf-8")
+            tmp.replace(self._cache_path)
+        except Exception as e:
+            log.warning("  ⚠️  Impossibile salvare cache legislature: %s", e)
+
+    def _html_fresh(self, url: str) -> bool:
+        """True se la pagina è in cache (o in download) e non è scaduta"""
+        hit = self._html_cache.get(url)
+        return hit is not None and time.monotonic() - hit[0] < HTML_CACHE_TTL
+
+    def _get_html(self, url: str, headers: Optional[Dict[str, str]] = None) -> requests.Response:
+        """GET di una pagina HTML memoizzato per URL; i thread concorrenti attendono la stessa richiesta"""
+        with self._lock:
+            if self._html_fresh(url):
+                future = self._html_cache[url][1]
+                owner = False
+            else:
+                future = Future()
+                self._html_cache[url] = (time.monotonic(), future)
+                owner = True
+        
+        if not owner:
+            return future.result()
+        
+        try:
+            _html_limiter.acquire()
+            with _host_slot(url):
+                r = _get_session().get(url, timeout=TIMEOUT_HTML, headers=headers)
+        except Exception as e:
+            with self._lock:
+                self._html_cache.pop(url, None)
+            future.set_exception(e)
+            raise
+        
+        if r.status_code != 200:
+            # Solo le pagine valide restano in cache: 403/404/304 si richiedono di nuovo
+            with self._lock:
+                self._html_cache.pop(url, None)
+        future.set_result(r)
+        return r
+
+    def _forbidden_pause(self, r: Optional[requests.Response] = None):
+        """Circuit breaker per i 403: rispetta Retry-After se presente, altrimenti pausa lunga con jitter"""
+        retry_after = r.headers.get("Retry-After") if r is not None else None
+        if retry_after:
+            try:
+                delay = float(retry_after)
+            except ValueError:
+                # Formato data HTTP
+                try:
+                    delay = (parsedate_to_datetime(retry_after) - dt.datetime.now(dt.timezone.utc)).total_seconds()
+                except (TypeError, ValueError):
+                    delay = None
+            if delay is not None:
+                time.sleep(min(max(delay, 0.0), MAX_RETRY_AFTER) + random.uniform(0, 1))
+                return
+        self._sleep(FORBIDDEN_PAUSE, FORBIDDEN_JITTER)
+
+    def _probe_exists(self, url: str) -> Optional[bool]:
+        """Probe HEAD: False se 404, True se 200, None se non affidabile (serve GET)"""
+        try:
+            with _host_slot(url):
+                r = _get_session().head(url, timeout=TIMEOUT_HTML, allow_redirects=True)
+                if r.status_code in (405, 501):
+                    # HEAD non consentito: GET in streaming, si leggono al massimo PROBE_BYTES
+                    with _get_session().get(url, stream=True, timeout=TIMEOUT_HTML) as r:
+                        next(r.iter_content(PROBE_BYTES), b"")
+        except requests.RequestException:
+            return None
+        
+        if r.status_code == 404:
+            return False
+        if r.status_code == 200:
+            return True
+        return None
+
     def identify_current_legislature(self) -> Optional[str]:
         """Identifica la legislatura corrente dal sito"""
-        print("🔍 Identificazione legislatura corrente...")
+        log.info("🔍 Identificazione legislatura corrente...")
         
         try:
-            self._sleep(DELAY_HTML, JITTER_HTML)
-            
-            url = BASE_TEMPLATE_ATTUALE.format(year=self.current_year)
-            r = session.get(url, timeout=TIMEOUT_HTML)
+            url = _listing_url(None, self.current_year)
+            r = self._get_html(url)
             
             if r.status_code != 200:
                 return None
                 
-            soup = BeautifulSoup(r.text, "html.parser")
+            tree = lh.fromstring(r.content)
             
             # Cerca nei link PDF
-            pdf_links = soup.select('a[href$=".pdf"]')
-            for link in pdf_links[:5]:
-                href = link.get('href', '')
+            pdf_hrefs = [href for _, href in _iter_pdf_anchors(tree)]
+            for href in pdf_hrefs[:5]:
                 # Cerca pattern /legislature/XX/ o simili
                 match = re.search(r'/legislature/(\d+)/', href)
                 if match:
                     leg = match.group(1)
-                    print(f"  ✅ Legislatura corrente: {leg}")
+                    log.info("  ✅ Legislatura corrente: %s", leg)
                     return leg
                 
                 # O cerca leg19, leg 19, etc
                 match = re.search(r'leg\s*(\d+)', href, re.IGNORECASE)
                 if match:
                     leg = match.group(1)
-                    print(f"  ✅ Legislatura corrente: {leg}")
+                    log.info("  ✅ Legislatura corrente: %s", leg)
                     return leg
             
-            # Cerca nel testo
-            text = soup.get_text()
-            patterns = [
-                r'XIX\s+legislatura',  # Assumiamo XIX = 19
-                r'(\d+)ª?\s+legislatura',
-                r'Legislatura\s+(\d+)'
-            ]
+            # Cerca nel testo: stesso albero dei link, regex solo sui nodi che nominano la legislatura
+            text = " ".join(el.text_content() for el in _LEG_TEXT_XPATH(tree))
+            if not text:
+                return None
             
-            for pattern in patterns:
-                match = re.search(pattern, text, re.IGNORECASE)
+            for pattern, group in _LEG_TEXT_PATTERNS:
+                match = pattern.search(text)
                 if match:
-                    leg = match.group(1) if '(' in pattern else '19'  # XIX = 19
-                    print(f"  ✅ Legislatura corrente: {leg}")
+                    leg = match.group(group) if group else '19'  # XIX = 19
+                    log.info("  ✅ Legislatura corrente: %s", leg)
                     return leg
             
             return None
             
         except Exception as e:
-            print(f"  ❌ Errore: {e}")
+            log.error("  ❌ Errore: %s", e)
             return None
 
-    def test_legislature_years(self, leg: str) -> Tuple[Optional[int], Optional[int]]:
-        """Testa gli anni di una legislatura PASSATA usando BASE_TEMPLATE"""
-        print(f"  🔍 Test anni legislatura {leg}...")
+    def _count_year_docs(self, leg: str, year: int) -> int:
+        """Numero di PDF nell'elenco (leg, anno) di una legislatura passata; 0 se assente"""
+        # Indice minimo dei run precedenti: nessuna richiesta per gli anni già sondati
+        key = f"{leg}/{year}"
+        cached = self._year_counts.get(key)
+        if cached is not None and year < self.current_year:
+            return cached
+        
+        try:
+            # SEMPRE l'URL della legislatura per testare
+            url = _listing_url(leg, year)
+            
+            # HEAD prima del GET: gli anni inesistenti (la maggioranza) non scaricano HTML
+            if not self._html_fresh(url):
+                _html_limiter.acquire()
+                if self._probe_exists(url) is False:
+                    self._store_year_count(key, year, 0)
+                    return 0
+            
+            r = self._get_html(url)
+            
+            if r.status_code == 403:
+                log.warning("    ⚠️  403 per anno %d - pausa...", year)
+                self._forbidden_pause(r)
+                return 0
+                
+            if r.status_code != 200:
+                return 0
+            
+            tree = lh.fromstring(r.content)
+            count = int(_PDF_COUNT_XPATH(tree))
+            
+            if count:
+                log.info("    ✅ Anno %d: %d documenti", year, count)
+            self._store_year_count(key, year, count)
+            return count
+                    
+        except Exception:
+            return 0
+
+    def _store_year_count(self, key: str, year: int, count: int):
+        """Salva nell'indice il conteggio di un anno concluso (salvato con la cache legislature)"""
+        if year < self.current_year:
+            with self._lock:
+                self._year_counts[key] = count
+
+    def _find_boundary_year(self, leg: str, anchor: int, direction: int, min_year: int, max_year: int) -> int:
+        """Ultimo anno con documenti partendo da anchor verso direction (-1/+1): galoppo + bisezione"""
+        last_good = anchor
+        step = 1
+        while True:
+            probe = anchor + direction * step
+            if probe < min_year or probe > max_year:
+                first_bad = min_year - 1 if direction < 0 else max_year + 1
+                break
+            if not self._count_year_docs(leg, probe):
+                first_bad = probe
+                break
+            last_good = probe
+            step *= 2
         
-        # Range di test
+        # Confine tra last_good (con documenti) e first_bad (senza)
+        while abs(first_bad - last_good) > 1:
+            mid = (first_bad + last_good) // 2
+            if self._count_year_docs(leg, mid):
+                last_good = mid
+            else:
+                first_bad = mid
+        return last_good
+
+    def _year_bounds(self, leg: str) -> Tuple[int, int]:
+        """Anni possibili per una legislatura: tra la fine della precedente e l'inizio della successiva"""
         min_year = max(1946, self.current_year - 80)
         max_year = self.current_year
         
-        years_with_docs = []
+        prev_num, next_num = str(int(leg) - 1), str(int(leg) + 1)
+        prev_end = self.legislature_info.get(prev_num, {}).get('end_year') or \
+            (LEGISLATURE_CALENDAR.get(prev_num) or (None, None))[1]
+        next_start = self.legislature_info.get(next_num, {}).get('start_year') or \
+            (LEGISLATURE_CALENDAR.get(next_num) or (None, None))[0]
         
-        for year in range(min_year, max_year + 1):
-            try:
-                self._sleep(DELAY_HTML, JITTER_HTML)
-                
-                # SEMPRE BASE_TEMPLATE per testare
-                url = BASE_TEMPLATE.format(leg=leg, year=year)
-                r = session.get(url, timeout=TIMEOUT_HTML)
-                
-                if r.status_code == 403:
-                    print(f"    ⚠️  403 per anno {year} - pausa...")
-                    time.sleep(30)
-                    continue
-                    
-                if r.status_code == 404:
-                    continue
-                    
-                if r.status_code == 200:
-                    soup = BeautifulSoup(r.text, "html.parser")
-                    pdf_links = soup.select('a[href$=".pdf"]')
-                    
-                    if pdf_links:
-                        years_with_docs.append(year)
-                        print(f"    ✅ Anno {year}: {len(pdf_links)} documenti")
-                        
-            except Exception:
-                continue
+        # L'anno di passaggio è condiviso tra due legislature consecutive
+        if prev_end and min_year <= prev_end <= max_year:
+            min_year = prev_end
+        if next_start and min_year <= next_start <= max_year:
+            max_year = next_start
+        return min_year, max_year
+
+    def test_legislature_years(self, leg: str, anchor_year: Optional[int] = None) -> Tuple[Optional[int], Optional[int]]:
+        """Testa gli anni di una legislatura PASSATA usando l'URL della legislatura"""
+        log.info("  🔍 Test anni legislatura %s...", leg)
+        
+        # Range di test: ristretto dalle legislature adiacenti già note
+        min_year, max_year = self._year_bounds(leg)
+        
+        # Con un anno di partenza plausibile (fine della legislatura precedente) bastano
+        # O(log N) probe: gli anni di una legislatura sono contigui
+        if anchor_year and min_year <= anchor_year <= max_year and self._count_year_docs(leg, anchor_year):
+            start_year = self._find_boundary_year(leg, anchor_year, -1, min_year, max_year)
+            end_year = self._find_boundary_year(leg, anchor_year, +1, min_year, max_year)
+            log.info("    📊 Legislatura %s: %s-%s", leg, start_year, end_year)
+            return start_year, end_year
+        
+        # Anni indipendenti: probe in parallelo con concorrenza limitata
+        years = range(min_year, max_year + 1)
+        with ThreadPoolExecutor(max_workers=PROBE_WORKERS) as pool:
+            doc_counts = pool.map(lambda year: self._count_year_docs(leg, year), years)
+            years_with_docs = [year for year, count in zip(years, doc_counts) if count]
         
         if years_with_docs:
-            start_year = min(years_with_docs)
-            end_year = max(years_with_docs)
-            print(f"    📊 Legislatura {leg}: {start_year}-{end_year}")
+            # pool.map conserva l'ordine degli anni: primo e ultimo sono già minimo e massimo
+            start_year, end_year = years_with_docs[0], years_with_docs[-1]
+            log.info("    📊 Legislatura %s: %s-%s", leg, start_year, end_year)
             return start_year, end_year
         else:
-            print(f"    ❌ Legislatura {leg}: nessun documento trovato")
+            log.error("    ❌ Legislatura %s: nessun documento trovato", leg)
             return None, None
 
     def determine_all_legislatures_info(self, start_leg: str) -> Dict[str, Dict]:
         """Determina info di tutte le legislature necessarie"""
-        print("📊 Determinazione info legislature...")
+        log.info("📊 Determinazione info legislature...")
         
         # Prima identifica la corrente
         self.current_legislature = self.identify_current_legislature()
         if not self.current_legislature:
-            print("  ⚠️  Non riesco a identificare la legislatura corrente, assumo 19")
+            log.warning("  ⚠️  Non riesco a identificare la legislatura corrente, assumo 19")
             self.current_legislature = "19"
         
         current_num = int(self.current_legislature)
         start_num = int(start_leg)
         
-        # Testa tutte le legislature passate nel range
+        # Testa tutte le legislature passate nel range (probe solo se fuori calendario)
         for leg_num in range(max(1, start_num - 5), current_num):
             leg_str = str(leg_num)
-            start_year, end_year = self.test_legislature_years(leg_str)
+            known = LEGISLATURE_CALENDAR.get(leg_str)
+            cached = self.legislature_info.get(leg_str, {})
+            checked_at = time.time()
+            if known and known[1] is not None:
+                start_year, end_year = known
+            elif cached.get('end_year') and cached['end_year'] < self.current_year - 1:
+                # Legislatura chiusa già scoperta in un run precedente: non cambia più
+                start_year, end_year = cached['start_year'], cached['end_year']
+                checked_at = cached.get('checked_at', checked_at)
+            else:
+                prev_end = self.legislature_info.get(str(leg_num - 1), {}).get('end_year')
+                start_year, end_year = self.test_legislature_years(leg_str, anchor_year=prev_end)
             
             if start_year and end_year:
                 self.legislature_info[leg_str] = {
                     'start_year': start_year,
                     'end_year': end_year,
-                    'exists': True
+                    'exists': True,
+                    'checked_at': checked_at
                 }
+                self._run_legislatures.add(leg_str)
         
         # Info legislatura corrente
         if self.current_legislature:
@@ -188,7 +636,10 @@ class SimpleCorrectSenatoPDFDownloader:
             prev_num = current_num - 1
             prev_info = self.legislature_info.get(str(prev_num), {})
             
-            if prev_info.get('end_year'):
+            known = LEGISLATURE_CALENDAR.get(self.current_legislature)
+            if known:
+                current_start = known[0]
+            elif prev_info.get('end_year'):
                 current_start = prev_info['end_year']
             else:
                 current_start = self.current_year - 5  # Stima
@@ -197,156 +648,210 @@ class SimpleCorrectSenatoPDFDownloader:
                 'start_year': current_start,
                 'end_year': self.current_year,
                 'exists': True,
-                'is_current': True
+                'is_current': True,
+                'checked_at': time.time()
             }
+            self._run_legislatures.add(self.current_legislature)
             
-            print(f"  📍 Legislatura corrente {self.current_legislature}: {current_start}-{self.current_year}")
+            log.info("  📍 Legislatura corrente %s: %s-%s", self.current_legislature, current_start, self.current_year)
         
+        self._save_legislature_cache()
         return self.legislature_info
 
     def find_legislatures_for_range(self, start_date: dt.date, end_date: dt.date) -> List[str]:
         """Trova legislature che coprono il range di date"""
-        print(f"🎯 Selezione legislature per {start_date} → {end_date}")
+        log.info("🎯 Selezione legislature per %s → %s", start_date, end_date)
         
+        # Legislature ordinate per anno di inizio: inizi e fini crescono insieme
+        legs = sorted(
+            ((info['start_year'], int(leg), info) for leg, info in self.legislature_info.items()
+             if leg in self._run_legislatures and info.get('exists')),
+            key=lambda x: (x[0], x[1])
+        )
+        starts = [start_year for start_year, _, _ in legs]
+        
+        # Ultima legislatura iniziata entro end_date (bisezione), poi a ritroso finché copre start_date
         selected = []
+        idx = bisect.bisect_right(starts, end_date.year) - 1
+        while idx >= 0:
+            start_year, leg_num, info = legs[idx]
+            if dt.date(info['end_year'], 12, 31) < start_date:
+                break
+            selected.append(str(leg_num))
+            idx -= 1
+        selected.reverse()
         
-        for leg, info in sorted(self.legislature_info.items(), key=lambda x: int(x[0])):
-            if not info.get('exists'):
-                continue
-                
-            leg_start = dt.date(info['start_year'], 1, 1)
-            leg_end = dt.date(info['end_year'], 12, 31)
-            
-            # Check overlap
-            if leg_end >= start_date and leg_start <= end_date:
-                selected.append(leg)
-                print(f"  ✅ Legislatura {leg} ({info['start_year']}-{info['end_year']})")
+        for leg in selected:
+            info = self.legislature_info[leg]
+            log.info("  ✅ Legislatura %s (%s-%s)", leg, info['start_year'], info['end_year'])
         
         return selected
 
+    def _listing_frozen(self, leg: str, year: int) -> bool:
+        """True se l'elenco (leg, anno) è definitivo: legislatura passata e anno chiuso"""
+        if leg == self.current_legislature or year >= self.current_year - 1:
+            return False
+        end_year = self.legislature_info.get(leg, {}).get('end_year')
+        return bool(end_year) and end_year < self.current_year - 1
+
     def get_pdf_links_with_dates(self, leg: str, year: int) -> List[Tuple[str, str, Optional[str]]]:
         """Ottiene i link PDF con le date"""
-        self._sleep(DELAY_HTML, JITTER_HTML)
-        
         # Usa template corretto
-        is_current = (leg == self.current_legislature)
-        if is_current:
-            url = BASE_TEMPLATE_ATTUALE.format(year=year)
-        else:
-            url = BASE_TEMPLATE.format(leg=leg, year=year)
+        url = _listing_url(None if leg == self.current_legislature else leg, year)
+        
+        # GET condizionale: se la pagina non è cambiata il server risponde 304 e si riusano i link salvati
+        key = f"{leg}/{year}"
+        cached = self._listings.get(key)
+        
+        # Legislatura chiusa da oltre un anno: l'elenco non cambia più, nessuna richiesta
+        if cached and self._listing_frozen(leg, year):
+            return [tuple(link) for link in cached["links"]]
+        
+        req_headers = {}
+        if cached:
+            if cached.get("etag"):
+                req_headers["If-None-Match"] = cached["etag"]
+            if cached.get("last_modified"):
+                req_headers["If-Modified-Since"] = cached["last_modified"]
         
         try:
-            r = session.get(url, timeout=TIMEOUT_HTML)
+            # Se la pagina è già stata scaricata nel probe degli anni si riusa senza nuove richieste
+            r = self._get_html(url, None if self._html_fresh(url) else req_headers)
+            
+            if r.status_code == 304 and cached:
+                return [tuple(link) for link in cached["links"]]
             
             if r.status_code == 403:
-                print(f"    ⚠️  403 Forbidden")
-                time.sleep(30)
+                log.warning("    ⚠️  403 Forbidden")
+                self._forbidden_pause(r)
                 return []
                 
             if r.status_code != 200:
                 return []
             
-            soup = BeautifulSoup(r.text, "html.parser")
+            tree = lh.fromstring(r.content)
+            lines = r.text.split("\n")
+            # Anchor per riga sorgente: la riga vale come contesto solo se contiene un anchor soltanto
+            # (HTML minificato o su una riga: più link condividono la riga e le sue date)
+            anchors_per_line = Counter(el.sourceline for el in tree.iter("a"))
             links = []
             
-            mesi = {
-                'gennaio': '01', 'febbraio': '02', 'marzo': '03', 'aprile': '04',
-                'maggio': '05', 'giugno': '06', 'luglio': '07', 'agosto': '08', 
-                'settembre': '09', 'ottobre': '10', 'novembre': '11', 'dicembre': '12'
-            }
-            
-            for a in soup.select('a[href$=".pdf"]'):
-                pdf_url = urljoin("https://www.senato.it/", a["href"])
+            for a, href in _iter_pdf_anchors(tree):
+                pdf_url = _abs(href)
                 filename = pdf_url.rsplit("/", 1)[1]
                 
-                # Cerca data
-                extracted_date = None
-                for parent in [a.parent, a.parent.parent if a.parent else None]:
-                    if not parent:
-                        continue
-                    
-                    text = parent.get_text()
-                    
-                    # Pattern data italiana
-                    match = re.search(r'(\d{1,2})\s+(gennaio|febbraio|marzo|aprile|maggio|giugno|luglio|agosto|settembre|ottobre|novembre|dicembre)\s+(\d{4})', text, re.IGNORECASE)
-                    if match:
-                        day = match.group(1).zfill(2)
-                        month = mesi.get(match.group(2).lower())
-                        year_found = match.group(3)
-                        if month:
-                            extracted_date = f"{year_found}-{month}-{day}"
-                            break
+                # Cerca data nel blocco dell'anchor (genitore, poi nonno): mai nelle righe vicine,
+                # che appartengono ad altre voci dell'elenco
+                extracted_date = extract_italian_date(_PARENT_TEXT_XPATH(a))
+                if extracted_date is None and _GRANDPARENT_PDFS_XPATH(a) == 1:
+                    extracted_date = extract_italian_date(_GRANDPARENT_TEXT_XPATH(a))
+                line_no = a.sourceline
+                if extracted_date is None and line_no and line_no <= len(lines) and anchors_per_line[line_no] == 1:
+                    extracted_date = extract_italian_date(lines[line_no - 1])
                 
                 links.append((pdf_url, filename, extracted_date))
             
+            etag = r.headers.get("ETag")
+            last_modified = r.headers.get("Last-Modified")
+            if etag or last_modified or self._listing_frozen(leg, year):
+                with self._lock:
+                    self._listings[key] = {"etag": etag, "last_modified": last_modified, "links": links}
+            
             return links
             
         except Exception as e:
-            print(f"  ❌ Errore: {e}")
+            log.error("  ❌ Errore: %s", e)
             return []
 
-    def download_pdf(self, url: str, filename: str, leg: str, extracted_date: Optional[str], dest_dir: Path) -> bool:
+    def download_pdf(self, url: str, filename: str, leg: str, extracted_date: Optional[str], dest_dir: Path,
+                     existing: Optional[Set[str]] = None) -> bool:
         """Download PDF - SENZA SOTTOCARTELLE ANNI"""
         file_id = f"{leg}_{filename}"
-        if file_id in self.processed_files:
-            return True
         
+        # Con più thread lo stesso file non deve essere scaricato due volte in parallelo
+        with self._lock:
+            if file_id in self.processed_files or file_id in self._in_flight:
+                return True
+            self._in_flight.add(file_id)
+        
+        try:
+            return self._download_pdf(url, filename, file_id, leg, extracted_date, dest_dir, existing)
+        finally:
+            with self._lock:
+                self._in_flight.discard(file_id)
+
+    def _download_pdf(self, url: str, filename: str, file_id: str, leg: str, extracted_date: Optional[str],
+                      dest_dir: Path, existing: Optional[Set[str]]) -> bool:
         # Path semplice: solo legislatura_XX/filename.pdf
         dest_path = dest_dir / f"legislatura_{leg}" / filename
         
-        if dest_path.exists():
-            print(f"  ✓ Esiste: {filename}")
-            self.processed_files.add(file_id)
+        already_there = filename in existing if existing is not None else dest_path.exists()
+        if already_there:
+            file_log.info("  ✓ Esiste: %s", filename)
+            self._mark_processed(file_id, dest_path)
             return True
         
-        dest_path.parent.mkdir(parents=True, exist_ok=True)
+        if existing is None:
+            # Chiamata diretta: download_legislature crea la cartella una volta sola
+            dest_path.parent.mkdir(parents=True, exist_ok=True)
 
+        # Errori di connessione/status già ritentati dall'adapter (Retry urllib3): il ciclo qui ripete
+        # dopo un 403 (pausa da circuit breaker) e dopo errori a metà body (read timeout, reset)
         for attempt in range(1, RETRIES + 1):
             try:
-                print(f"  ⬇️  {filename} (tent. {attempt})...")
-                self._sleep(DELAY_PDF, JITTER_PDF)
+                file_log.info("  ⬇️  %s (tent. %d)...", filename, attempt)
+                _pdf_limiter.acquire()
                 
-                with session.get(url, stream=True, timeout=TIMEOUT_PDF) as r:
+                # Il 403 mantiene lo slot durante la pausa: gli altri worker non insistono sull'host
+                with _host_slot(url), _get_session().get(url, stream=True, timeout=TIMEOUT_PDF) as r:
                     if r.status_code == 403:
-                        print(f"       ⚠️  403 - pausa lunga...")
-                        time.sleep(60)
+                        file_log.warning("       ⚠️  403 - pausa lunga...")
+                        self._forbidden_pause(r)
                         continue
                         
                     r.raise_for_status()
                     
                     tmp = dest_path.with_suffix(".part")
-                    with open(tmp, "wb") as f:
-                        for chunk in r.iter_content(8192):
-                            f.write(chunk)
+                    # Copia diretta dal socket al file: chunk da 1 MiB, nessun buffer Python intermedio
+                    r.raw.decode_content = True
+                    with open(tmp, "wb", buffering=0) as f:
+                        shutil.copyfileobj(r.raw, f, PDF_CHUNK_SIZE)
                     tmp.rename(dest_path)
                 
-                print(f"  ✅ OK: {filename}")
+                if existing is not None:
+                    existing.add(filename)
+                file_log.info("  ✅ OK: %s", filename)
                 
                 # Metadata
                 self.create_metadata(dest_path, leg, extracted_date)
-                self.processed_files.add(file_id)
+                self._mark_processed(file_id, dest_path)
                 return True
                 
+            except requests.exceptions.RetryError as e:
+                # L'adapter ha già esaurito i tentativi con backoff esponenziale: inutile ripetere qui
+                file_log.error("  ❌ FAIL: %s (tentativi esauriti: %s)", filename, e)
+                dest_path.with_suffix(".part").unlink(missing_ok=True)
+                return False
             except Exception as e:
+                dest_path.with_suffix(".part").unlink(missing_ok=True)
                 if attempt == RETRIES:
-                    print(f"  ❌ FAIL: {filename}")
+                    file_log.error("  ❌ FAIL: %s (%s)", filename, e)
                     return False
-                print(f"       Retry {attempt}/{RETRIES}...")
-                time.sleep(BACKOFF)
+                file_log.warning("       Retry %d/%d (%s)...", attempt, RETRIES, e)
+                self._sleep(BACKOFF_FACTOR * 2 ** (attempt - 1), BACKOFF_FACTOR)
         
+        file_log.error("  ❌ FAIL: %s (403 persistente)", filename)
         return False
 
     def create_metadata(self, pdf_path: Path, leg: str, extracted_date: Optional[str]):
-        """Crea metadata JSON"""
+        """Aggiunge il record metadata del PDF al manifest.jsonl della legislatura"""
         try:
             leg_info = self.legislature_info.get(leg, {})
             
             metadata = {
+                "file": pdf_path.name,
                 "legislatura": leg,
-                "source": "senato",
-                "document_type": "stenographic_report",
-                "institution": "senato_repubblica",
-                "language": "it",
+                **self._META_TEMPLATE,
                 "is_current_legislature": leg == self.current_legislature,
                 "created_at": dt.datetime.now(dt.timezone.utc).isoformat()
             }
@@ -363,22 +868,48 @@ class SimpleCorrectSenatoPDFDownloader:
             if leg_info:
                 metadata["legislature_years"] = f"{leg_info.get('start_year', '?')}-{leg_info.get('end_year', '?')}"
             
-            json_path = pdf_path.with_suffix(".json")
-            with open(json_path, "w", encoding="utf-8") as f:
-                json.dump(metadata, f, ensure_ascii=False, indent=2)
+            if orjson is not None:
+                line = orjson.dumps(metadata, option=orjson.OPT_NON_STR_KEYS) + b"\n"
+            else:
+                line = (json.dumps(metadata, ensure_ascii=False) + "\n").encode("utf-8")
+            
+            # Un solo writer per volta: le append di più thread non si interfogliano.
+            # Il manifest resta aperto per tutto il run: niente open/close per ogni PDF
+            with self._lock:
+                manifest_path = pdf_path.parent / MANIFEST_NAME
+                f = self._manifests.get(manifest_path)
+                if f is None:
+                    f = self._manifests[manifest_path] = open(manifest_path, "ab")
+                f.write(line)
                 
         except Exception as e:
-            print(f"  ⚠️  Errore metadata: {e}")
+            file_log.warning("  ⚠️  Errore metadata: %s", e)
+
+    def _filter_links_by_date(self, links: List[Tuple[str, str, Optional[str]]], start_date: dt.date, end_date: dt.date) -> List[Tuple[str, str, Optional[str]]]:
+        """Filtra i link per range di date (i link senza data sono sempre inclusi)"""
+        filtered_links = []
+        for url, filename, date_str in links:
+            if date_str:
+                try:
+                    doc_date = dt.datetime.strptime(date_str, "%Y-%m-%d").date()
+                    if doc_date >= start_date and doc_date <= end_date:
+                        filtered_links.append((url, filename, date_str))
+                except:
+                    filtered_links.append((url, filename, date_str))
+            else:
+                # Se non ho la data, includo comunque
+                filtered_links.append((url, filename, date_str))
+        return filtered_links
 
     def download_legislature(self, leg: str, start_date: dt.date, end_date: dt.date, dest_dir: Path) -> Tuple[int, int]:
         """Scarica una legislatura nel range di date"""
-        print(f"\n📄 DOWNLOAD LEGISLATURA {leg}")
+        log.info("\n📄 DOWNLOAD LEGISLATURA %s", leg)
         
         leg_info = self.legislature_info.get(leg, {})
         is_current = leg_info.get('is_current', False)
         
         if is_current:
-            print(f"  🌟 LEGISLATURA CORRENTE - uso template attuale")
+            log.info("  🌟 LEGISLATURA CORRENTE - uso template attuale")
         
         # Anni da processare
         year_start = max(leg_info.get('start_year', start_date.year), start_date.year)
@@ -387,54 +918,74 @@ class SimpleCorrectSenatoPDFDownloader:
         total_ok = 0
         total_err = 0
         
-        for year in range(year_start, year_end + 1):
-            links = self.get_pdf_links_with_dates(leg, year)
-            
-            if not links:
-                print(f"  📭 Anno {year}: nessun PDF")
-                continue
-            
-            # Filtra per date se necessario
-            filtered_links = []
-            for url, filename, date_str in links:
-                if date_str:
-                    try:
-                        doc_date = dt.datetime.strptime(date_str, "%Y-%m-%d").date()
-                        if doc_date >= start_date and doc_date <= end_date:
-                            filtered_links.append((url, filename, date_str))
-                    except:
-                        filtered_links.append((url, filename, date_str))
-                else:
-                    # Se non ho la data, includo comunque
-                    filtered_links.append((url, filename, date_str))
+        # Cartella creata una volta e una sola scansione al posto di mkdir + stat per ogni PDF
+        leg_dir = dest_dir / f"legislatura_{leg}"
+        leg_dir.mkdir(parents=True, exist_ok=True)
+        existing = set(e.name for e in os.scandir(leg_dir))
+        
+        # Pipeline a due stadi: elenchi degli anni in parallelo, i PDF partono
+        # appena l'elenco del rispettivo anno è disponibile
+        with ThreadPoolExecutor(max_workers=YEAR_WORKERS) as list_pool, \
+                ThreadPoolExecutor(max_workers=self.pdf_workers) as pdf_pool:
+            list_futures = {
+                list_pool.submit(self.get_pdf_links_with_dates, leg, year): year
+                for year in range(year_start, year_end + 1)
+            }
+            pdf_futures = []
+            # Documenti elencati in più anni: un solo task per URL
+            seen_urls: Set[str] = set()
             
-            if not filtered_links:
-                print(f"  📭 Anno {year}: nessun PDF nel range date")
-                continue
+            for future in as_completed(list_futures):
+                year = list_futures[future]
+                links = future.result()
+                
+                if not links:
+                    log.info("  📭 Anno %d: nessun PDF", year)
+                    continue
+                
+                filtered_links = self._filter_links_by_date(links, start_date, end_date)
+                
+                if not filtered_links:
+                    log.info("  📭 Anno %d: nessun PDF nel range date", year)
+                    continue
+                    
+                log.info("  📄 Anno %d: %d PDF", year, len(filtered_links))
                 
-            print(f"  📄 Anno {year}: {len(filtered_links)} PDF")
+                for url, filename, date in filtered_links:
+                    if url in seen_urls:
+                        continue
+                    seen_urls.add(url)
+                    # Già nell'indice persistente: nessun task né accesso alla rete
+                    if f"{leg}_{filename}" in self.processed_files:
+                        total_ok += 1
+                        continue
+                    pdf_futures.append(pdf_pool.submit(self.download_pdf, url, filename, leg, date, dest_dir, existing))
             
-            for url, filename, date in filtered_links:
-                if self.download_pdf(url, filename, leg, date, dest_dir):
+            for future in as_completed(pdf_futures):
+                if future.result():
                     total_ok += 1
                 else:
                     total_err += 1
         
-        print(f"  📊 Totale: {total_ok} OK, {total_err} errori")
+        log.info("  📊 Totale: %d OK, %d errori", total_ok, total_err)
         return total_ok, total_err
 
     def run(self, leg_start: str, date_start: Optional[dt.date], date_end: Optional[dt.date], dest_dir: Path) -> bool:
         """Run principale"""
-        print(f"🏛️  SENATO - SIMPLE AND CORRECT DOWNLOADER")
-        print(f"📋 Legislatura riferimento: {leg_start}")
+        log.info("🏛️  SENATO - SIMPLE AND CORRECT DOWNLOADER")
+        log.info("📋 Legislatura riferimento: %s", leg_start)
+        
+        # Data di riferimento letta una volta per run: anno corrente e fine range restano coerenti
+        today = dt.date.today()
+        self.current_year = today.year
         
         if not date_start:
             date_start = dt.date(1946, 1, 1)
         if not date_end:
-            date_end = dt.date.today()
+            date_end = today
             
-        print(f"📅 Range date: {date_start} → {date_end}")
-        print(f"📁 Output: {dest_dir}")
+        log.info("📅 Range date: %s → %s", date_start, date_end)
+        log.info("📁 Output: %s", dest_dir)
         
         # Step 1: Determina info legislature
         self.determine_all_legislatures_info(leg_start)
@@ -443,25 +994,36 @@ class SimpleCorrectSenatoPDFDownloader:
         legislature = self.find_legislatures_for_range(date_start, date_end)
         
         if not legislature:
-            print("❌ Nessuna legislatura nel range")
+            log.error("❌ Nessuna legislatura nel range")
             return False
         
         # Step 3: Download
         total_ok = 0
         total_err = 0
         
-        for i, leg in enumerate(legislature, 1):
-            print(f"\n{'='*50}")
-            print(f"LEGISLATURA {i}/{len(legislature)}: {leg}")
-            print(f"{'='*50}")
-            
-            ok, err = self.download_legislature(leg, date_start, date_end, dest_dir)
-            total_ok += ok
-            total_err += err
+        # Indice persistente: i re-run saltano i file già scaricati senza stat su disco
+        self._open_processed_db(dest_dir)
         
-        print(f"\n🏁 COMPLETATO")
-        print(f"✅ Scaricati: {total_ok}")
-        print(f"❌ Errori: {total_err}")
+        try:
+            for i, leg in enumerate(legislature, 1):
+                log.info("\n%s", "=" * 50)
+                log.info("LEGISLATURA %s/%s: %s", i, len(legislature), leg)
+                log.info("%s", "=" * 50)
+                
+                ok, err = self.download_legislature(leg, date_start, date_end, dest_dir)
+                total_ok += ok
+                total_err += err
+        finally:
+            # Salva i validatori delle pagine anno per i GET condizionali del prossimo run
+            self._save_legislature_cache()
+            for f in self._manifests.values():
+                f.close()
+            self._manifests.clear()
+            self._close_processed_db()
+        
+        log.info("\n🏁 COMPLETATO")
+        log.info("✅ Scaricati: %s", total_ok)
+        log.info("❌ Errori: %s", total_err)
         
         return total_err == 0
 
@@ -480,20 +1042,25 @@ Esempi:
     parser.add_argument("--from", dest="from_date", type=lambda s: dt.datetime.strptime(s, "%Y-%m-%d").date(), help="Data inizio")
     parser.add_argument("--to", dest="to_date", type=lambda s: dt.datetime.strptime(s, "%Y-%m-%d").date(), help="Data fine")
     parser.add_argument("--out", type=Path, required=True, help="Cartella output")
+    parser.add_argument("--workers", type=int, default=PDF_WORKERS, help=f"Download PDF paralleli (default: {PDF_WORKERS})")
+    parser.add_argument("--quiet", action="store_true", help="Nasconde i log per singolo file (restano errori e riepiloghi)")
     
     args = parser.parse_args()
     
+    if args.quiet:
+        file_log.setLevel(logging.WARNING)
+    
     try:
-        downloader = SimpleCorrectSenatoPDFDownloader()
+        downloader = SimpleCorrectSenatoPDFDownloader(pdf_workers=max(1, args.workers))
         success = downloader.run(args.leg, args.from_date, args.to_date, args.out)
         sys.exit(0 if success else 1)
         
     except KeyboardInterrupt:
-        print("\n🛑 Interrotto")
+        log.warning("\n🛑 Interrotto")
         sys.exit(130)
         
     except Exception as e:
-        print(f"\n💥 ERRORE: {e}")
+        log.error("\n💥 ERRORE: %s", e)
         import traceback
         traceback.print_exc()
         sys.exit(1)
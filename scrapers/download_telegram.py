@@ -19,9 +19,8 @@ import argparse
 import datetime as dt
 import json
 import asyncio
-import io
 from pathlib import Path
-from typing import Optional, Set
+from typing import Optional
 
 from dotenv import load_dotenv
 from telethon import TelegramClient
@@ -34,10 +33,20 @@ try:
 except ImportError:
     storage = None
 
+# orjson (opzionale) per parsing di batch.jsonl e scrittura metadata più veloci
+try:
+    import orjson
+except ImportError:
+    orjson = None
+json_loads = orjson.loads if orjson else json.loads
+
 load_dotenv()
 
 DEFAULT_CHANNEL = "fdiufficiale"
 CREDENTIALS_FILE = "GOOGLE_CREDENTIALS.json"
+DEDUP_CACHE_PREFIX = ".telegram_seen_"  # Cache id già su GCS (nella cartella output), per canale
+WRITER_WORKERS = 8      # Task che scrivono i file in thread, mentre il loop continua a ricevere messaggi
+WRITE_QUEUE_SIZE = 256  # Messaggi in attesa di scrittura (limita la memoria se il disco è lento)
 
 # ────────────────────────────────────────────────────────────────
 # Helper
@@ -56,25 +65,99 @@ def parse_iso(date_str: str) -> dt.datetime:
     return dt.datetime.strptime(date_str, "%Y-%m-%d")
 
 
+# Sanitizzazione nomi file: tabella translate per i testi ASCII, regex Unicode (precompilata) per gli altri
+_SANITIZE_RE = re.compile(r"[^\w\s-]")
+_STRIP_TABLE = {c: None for c in range(128) if _SANITIZE_RE.match(chr(c))}
+
+
 def sanitize_fragment(text: str, max_len: int = 50) -> str:
     frag = text.strip().split("\n", 1)[0][:max_len]
-    frag = re.sub(r"[^\w\s-]", "", frag)
-    frag = re.sub(r"\s+", "_", frag).strip("_")
+    if frag.isascii():
+        frag = frag.translate(_STRIP_TABLE)
+    else:
+        frag = _SANITIZE_RE.sub("", frag)
+    frag = "_".join(frag.split()).strip("_")
     return frag or "msg"
 
 # Regex per "Link post Fb:" / "Link post FB:"
 FB_LINK_RE = re.compile(r"Link\s+post\s+F[BB]?:?\s*(https?://\S+)", re.IGNORECASE)
 
 
-def get_existing_video_ids_from_gcs(bucket_name: str, gcs_prefix: str, channel: str) -> Set[str]:
+class MessageIdSet:
+    """Insieme di id messaggio come bitmap: gli id di un canale sono interi progressivi,
+    quindi 1 bit per id (~125 KB per 1M messaggi) invece di un set di stringhe"""
+
+    __slots__ = ("_bits", "_count")
+
+    def __init__(self):
+        self._bits = bytearray()
+        self._count = 0
+
+    def add(self, msg_id: int) -> None:
+        byte, mask = msg_id >> 3, 1 << (msg_id & 7)
+        if byte >= len(self._bits):
+            self._bits.extend(bytes(byte - len(self._bits) + 1))
+        if not self._bits[byte] & mask:
+            self._bits[byte] |= mask
+            self._count += 1
+
+    def __contains__(self, msg_id: int) -> bool:
+        byte = msg_id >> 3
+        return byte < len(self._bits) and bool(self._bits[byte] & (1 << (msg_id & 7)))
+
+    def __len__(self) -> int:
+        return self._count
+
+    def max_id(self) -> int:
+        """Id più alto presente (0 se vuoto)"""
+        bits = self._bits.rstrip(b"\x00")
+        if not bits:
+            return 0
+        return (len(bits) - 1) * 8 + bits[-1].bit_length() - 1
+
+    def to_bytes(self) -> bytes:
+        return bytes(self._bits)
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "MessageIdSet":
+        ids = cls()
+        ids._bits = bytearray(data)
+        ids._count = bin(int.from_bytes(data, "little")).count("1")
+        return ids
+
+
+def load_dedup_cache(cache_path: Path, generation: int) -> Optional[MessageIdSet]:
+    """Id già noti se la cache locale corrisponde alla generation attuale di batch.jsonl"""
+    try:
+        header, _, data = cache_path.read_bytes().partition(b"\n")
+        if int(header) == generation:
+            return MessageIdSet.from_bytes(data)
+    except (OSError, ValueError):
+        pass
+    return None
+
+
+def save_dedup_cache(cache_path: Path, generation: int, existing_ids: MessageIdSet) -> None:
+    """Salva la bitmap degli id con la generation di batch.jsonl (scrittura atomica)"""
+    try:
+        tmp_path = cache_path.with_suffix(".tmp")
+        tmp_path.write_bytes(f"{generation}\n".encode() + existing_ids.to_bytes())
+        tmp_path.replace(cache_path)
+    except OSError as e:
+        safe_print(f"⚠️  Impossibile salvare cache duplicati: {e}")
+
+
+def get_existing_video_ids_from_gcs(bucket_name: str, gcs_prefix: str, channel: str,
+                                    cache_dir: Optional[Path] = None) -> MessageIdSet:
     """
-    Legge batch.jsonl da GCS e estrae tutti i video_id già presenti per il canale Telegram specificato
+    Legge batch.jsonl da GCS e estrae tutti i video_id già presenti per il canale Telegram specificato.
+    Con cache_dir il risultato viene riusato finché batch.jsonl non cambia (stessa generation GCS)
     """
     if not storage:
         safe_print("⚠️  google-cloud-storage non installato, skip controllo duplicati")
-        return set()
+        return MessageIdSet()
     
-    existing_ids = set()
+    existing_ids = MessageIdSet()
     
     try:
         # Inizializza client GCS
@@ -90,25 +173,36 @@ def get_existing_video_ids_from_gcs(bucket_name: str, gcs_prefix: str, channel:
         safe_print(f"🔍 Controllo duplicati: gs://{bucket_name}/{batch_blob_path}")
         
         bucket = client.bucket(bucket_name)
-        blob = bucket.blob(batch_blob_path)
+        # get_blob: esistenza + generation con una sola richiesta di metadata
+        blob = bucket.get_blob(batch_blob_path)
         
-        if not blob.exists():
+        if blob is None:
             safe_print("📝 batch.jsonl non trovato - primo caricamento")
-            return set()
+            return MessageIdSet()
+        
+        cache_path = cache_dir / f"{DEDUP_CACHE_PREFIX}{channel}.bin" if cache_dir else None
+        if cache_path:
+            cached = load_dedup_cache(cache_path, blob.generation)
+            if cached is not None:
+                safe_print(f"🗂️  batch.jsonl invariato, cache locale: {len(cached)} video ID da saltare")
+                return cached
         
-        # Scarica e processa il batch.jsonl
-        content = blob.download_as_text()
+        # Legge il batch.jsonl in streaming (chunk da 1 MiB): memoria costante, parsing durante il download
         processed_records = 0
         telegram_records = 0
         
-        with io.StringIO(content) as f:
+        with blob.open("rt", encoding="utf-8", chunk_size=1 << 20) as f:
             for line_num, line in enumerate(f, 1):
                 if not line.strip():
                     continue
+                processed_records += 1
+                
+                # Prefiltro per sottostringa: le righe non Telegram o di altri canali non vengono parsate
+                if '"telegram"' not in line or channel not in line:
+                    continue
                     
                 try:
-                    record = json.loads(line)
-                    processed_records += 1
+                    record = json_loads(line)
                     
                     # Filtra solo record Telegram del canale specifico
                     struct_data = record.get('structData', {})
@@ -116,11 +210,10 @@ def get_existing_video_ids_from_gcs(bucket_name: str, gcs_prefix: str, channel:
                         struct_data.get('video_id') and
                         channel in record.get('content', {}).get('uri', '')):
                         
-                        video_id = str(struct_data['video_id'])
-                        existing_ids.add(video_id)
+                        existing_ids.add(int(struct_data['video_id']))
                         telegram_records += 1
                         
-                except (json.JSONDecodeError, KeyError, TypeError) as e:
+                except (json.JSONDecodeError, KeyError, TypeError, ValueError) as e:
                     safe_print(f"⚠️  Record malformato alla riga {line_num}: {e}")
                     continue
         
@@ -128,12 +221,68 @@ def get_existing_video_ids_from_gcs(bucket_name: str, gcs_prefix: str, channel:
         safe_print(f"📱 Trovati {telegram_records} record Telegram per {channel}")
         safe_print(f"🔒 Video ID da saltare: {len(existing_ids)}")
         
+        if cache_path:
+            save_dedup_cache(cache_path, blob.generation, existing_ids)
         return existing_ids
         
     except Exception as e:
         safe_print(f"❌ Errore controllo duplicati GCS: {e}")
         safe_print("⚠️  Continuo senza controllo duplicati")
-        return set()
+        return MessageIdSet()
+
+
+def write_message_files(msg, channel: str, out_dir: Path) -> None:
+    """Scrive .txt e .json di un messaggio (bloccante: eseguita in un thread)"""
+    local_dt = msg.date.astimezone()
+    subdir = out_dir / str(local_dt.year) / f"{local_dt.month:02d}"
+    subdir.mkdir(parents=True, exist_ok=True)
+
+    base = f"{local_dt.date()}_{msg.id}_{sanitize_fragment(msg.message)}"
+    txt_path = subdir / f"{base}.txt"
+    json_path = subdir / f"{base}.json"
+
+    if not txt_path.exists():
+        txt_path.write_text(msg.message, encoding="utf-8")
+
+    # video_id = id numerico del messaggio (parte finale dell'URL)
+    video_id = str(msg.id)
+
+    # facebook_url se presente nel testo
+    fb_url = None
+    m = FB_LINK_RE.search(msg.message)
+    if m:
+        fb_url = m.group(1).strip()
+
+    metadata = {
+        "id": msg.id,
+        "date": msg.date.isoformat(),
+        "views": msg.views,
+        "forwards": msg.forwards,
+        "reply_count": msg.replies.replies if msg.replies else None,
+        "url": f"https://t.me/{channel}/{msg.id}",
+        "source_type": "telegram",
+        "video_id": video_id,
+        "facebook_url": fb_url,
+        "text_file": str(txt_path.relative_to(out_dir)),
+    }
+    if orjson:
+        json_path.write_bytes(orjson.dumps(metadata, option=orjson.OPT_INDENT_2))
+    else:
+        json_path.write_text(json.dumps(metadata, ensure_ascii=False, indent=2), encoding="utf-8")
+
+
+async def message_writer(queue: asyncio.Queue, channel: str, out_dir: Path) -> int:
+    """Consuma la coda e scrive i file fuori dall'event loop; restituisce i messaggi salvati"""
+    saved = 0
+    while True:
+        msg = await queue.get()
+        if msg is None:
+            return saved
+        try:
+            await asyncio.to_thread(write_message_files, msg, channel, out_dir)
+            saved += 1
+        except Exception as e:
+            safe_print(f"❌ Errore scrittura messaggio {msg.id}: {e}")
 
 
 async def fetch_messages(
@@ -146,13 +295,14 @@ async def fetch_messages(
     to_dt: Optional[dt.datetime],
     bucket_name: Optional[str] = None,
     gcs_prefix: Optional[str] = "",
+    only_new: bool = False,
 ) -> None:
     out_dir.mkdir(parents=True, exist_ok=True)
 
     # CONTROLLO DUPLICATI: Leggi video_id esistenti da GCS
-    existing_ids = set()
+    existing_ids = MessageIdSet()
     if bucket_name:
-        existing_ids = get_existing_video_ids_from_gcs(bucket_name, gcs_prefix, channel)
+        existing_ids = get_existing_video_ids_from_gcs(bucket_name, gcs_prefix, channel, out_dir)
     else:
         safe_print("⚠️  Bucket GCS non specificato, skip controllo duplicati")
 
@@ -173,57 +323,38 @@ async def fetch_messages(
         query_kwargs = {}
         if to_dt:
             query_kwargs["offset_date"] = to_dt + dt.timedelta(days=1)
+        if only_new and len(existing_ids):
+            # Filtro lato server: solo messaggi più recenti dell'ultimo già su GCS
+            query_kwargs["min_id"] = existing_ids.max_id()
+            safe_print(f"⏩ Solo messaggi nuovi (id > {query_kwargs['min_id']})")
 
-        total = 0
         skipped = 0
-        async for msg in client.iter_messages(channel, **query_kwargs):
-            msg_dt_naive = msg.date.replace(tzinfo=None)
-            if from_dt and msg_dt_naive < from_dt:
-                break
-            if to_dt and msg_dt_naive > to_dt:
-                continue
-            if not msg.message:
-                continue
-
-            # CONTROLLO DUPLICATI: Skip se già processato
-            if str(msg.id) in existing_ids:
-                skipped += 1
-                continue
-
-            local_dt = msg.date.astimezone()
-            subdir = out_dir / str(local_dt.year) / f"{local_dt.month:02d}"
-            subdir.mkdir(parents=True, exist_ok=True)
-
-            base = f"{local_dt.date()}_{msg.id}_{sanitize_fragment(msg.message)}"
-            txt_path = subdir / f"{base}.txt"
-            json_path = subdir / f"{base}.json"
-
-            if not txt_path.exists():
-                txt_path.write_text(msg.message, encoding="utf-8")
-
-            # video_id = id numerico del messaggio (parte finale dell'URL)
-            video_id = str(msg.id)
-
-            # facebook_url se presente nel testo
-            fb_url = None
-            m = FB_LINK_RE.search(msg.message)
-            if m:
-                fb_url = m.group(1).strip()
-
-            metadata = {
-                "id": msg.id,
-                "date": msg.date.isoformat(),
-                "views": msg.views,
-                "forwards": msg.forwards,
-                "reply_count": msg.replies.replies if msg.replies else None,
-                "url": f"https://t.me/{channel}/{msg.id}",
-                "source_type": "telegram",
-                "video_id": video_id,
-                "facebook_url": fb_url,
-                "text_file": str(txt_path.relative_to(out_dir)),
-            }
-            json_path.write_text(json.dumps(metadata, ensure_ascii=False, indent=2), encoding="utf-8")
-            total += 1
+        # Il loop riceve e filtra i messaggi, la scrittura su disco avviene nei writer
+        queue: asyncio.Queue = asyncio.Queue(maxsize=WRITE_QUEUE_SIZE)
+        writers = [
+            asyncio.create_task(message_writer(queue, channel, out_dir))
+            for _ in range(WRITER_WORKERS)
+        ]
+        try:
+            async for msg in client.iter_messages(channel, **query_kwargs):
+                msg_dt_naive = msg.date.replace(tzinfo=None)
+                if from_dt and msg_dt_naive < from_dt:
+                    break
+                if to_dt and msg_dt_naive > to_dt:
+                    continue
+                if not msg.message:
+                    continue
+
+                # CONTROLLO DUPLICATI: Skip se già processato
+                if msg.id in existing_ids:
+                    skipped += 1
+                    continue
+
+                await queue.put(msg)
+        finally:
+            for _ in writers:
+                await queue.put(None)
+            total = sum(await asyncio.gather(*writers))
 
         # Report finale
         safe_print(f"SUCCESS: Salvati {total} nuovi messaggi, {skipped} saltati (duplicati)")
@@ -246,6 +377,9 @@ Esempi:
   # Con controllo duplicati GCS
   python download_telegram.py --out downloads/telegram --channel fdiufficiale --bucket documenti_fdi --gcs-prefix telegram
   
+  # Incrementale: solo messaggi più recenti dell'ultimo già caricato (filtro lato server)
+  python download_telegram.py --out downloads/telegram --bucket documenti_fdi --gcs-prefix telegram --only-new
+  
   # Range di date specifico
   python download_telegram.py --out downloads/telegram --from 2025-06-01 --to 2025-06-24
         """
@@ -258,6 +392,8 @@ Esempi:
     # Argomenti per controllo duplicati GCS
     p.add_argument("--bucket", help="Nome bucket GCS per controllo duplicati")
     p.add_argument("--gcs-prefix", default="", help="Prefisso GCS (default: root)")
+    p.add_argument("--only-new", action="store_true",
+                   help="Scarica solo messaggi successivi all'ultimo già su GCS (niente recupero di buchi storici)")
     
     args = p.parse_args()
 
@@ -281,7 +417,8 @@ Esempi:
             from_dt, 
             to_dt,
             args.bucket,
-            args.gcs_prefix
+            args.gcs_prefix,
+            args.only_new,
         )
     )
 
@@ -7,28 +7,58 @@ Versione migliorata con better error handling, logging e SHA-256 hash per sicure
 """
 from __future__ import annotations
 import argparse
+import base64
+import fnmatch
+import functools
 import hashlib
 import json
+import mimetypes
+import os
+import re
 import sys
 import tempfile
 import pathlib
 import datetime as dt
 from typing import Dict, List, Set, Optional
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from itertools import islice
+from threading import Lock
 
 try:
     from google.cloud import storage
     from google.api_core import exceptions
+    import google_crc32c  # Dipendenza di google-cloud-storage (google-resumable-media)
+    from requests.adapters import HTTPAdapter
     from tqdm import tqdm
 except ImportError as e:
     print(f"❌ ERRORE: Dipendenza mancante: {e}")
     print("🔧 Installa con: pip install -r requirements.txt")
     sys.exit(1)
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+json_loads = orjson.loads if orjson else json.loads  # Accettano entrambi bytes UTF-8
+
+try:
+    from google.cloud.storage import transfer_manager
+except ImportError:
+    transfer_manager = None  # google-cloud-storage troppo vecchio: solo upload singolo
+
 # ───────────────────────────── CONFIG
 CREDENTIALS_FILE: str = "GOOGLE_CREDENTIALS.json"
 CONFIG_FILE: str = "config.json"
 MAX_WORKERS: int = 16
+DELETE_BATCH_SIZE: int = 100  # Max operazioni per batch request GCS
+PARALLEL_UPLOAD_THRESHOLD: int = 128 * 1024 * 1024  # Oltre questa dimensione: upload a chunk paralleli
+PARALLEL_CHUNK_SIZE: int = 32 * 1024 * 1024
+PARALLEL_CHUNK_WORKERS: int = 8
+MANIFEST_NAME: str = "manifest.jsonl"  # Metadata per cartella (una riga per file) scritto dai downloader
 HASH_ALGORITHM: str = "SHA-256"
+HASH_BUFFER_SIZE: int = 1 << 20  # 1 MiB per lettura: poche iterazioni Python per file grandi
+JSONL_BUFFER_SIZE: int = 1 << 20  # Buffer di scrittura batch.jsonl: write() di sistema da 1 MiB
+JSONL_SPOOL_SIZE: int = 64 * 1024 * 1024  # batch.jsonl resta in memoria fino a questa dimensione, poi su disco
 
 # Base MIME types mapping (fallback universale)
 MIME_TYPE_MAPPING = {
@@ -39,8 +69,21 @@ MIME_TYPE_MAPPING = {
     "html": "text/html",
     "md": "text/markdown"
 }
+
+# Source del config -> (sourceType, prefisso titolo); le source "*youtube*" usano YOUTUBE_SOURCE_TYPE
+SOURCE_TYPES = {
+    "camera": ("parliamentary_records_camera", "Camera dei Deputati"),
+    "senato": ("parliamentary_records_senato", "Senato della Repubblica"),
+}
+YOUTUBE_SOURCE_TYPE = ("video_transcripts", "YouTube")
+DEFAULT_SOURCE_TYPE = ("parliamentary_records", None)
 # ───────────────────────────── END CONFIG
 
+_HAS_FILE_DIGEST = hasattr(hashlib, "file_digest")  # Python 3.11+
+# Path sorgente malformati (concatenazioni senza separatore), un'unica regex
+_PROBLEMATIC_PATH_RE = re.compile(r"downloadscamera|downloadsenato|camera2025|senato2025")
+_STRUCT_EXCLUDED_KEYS = frozenset(("source", "document_type", "language"))  # Già mappati in structData
+
 def load_config() -> Dict:
     """Carica configurazione da config.json"""
     try:
@@ -50,60 +93,175 @@ def load_config() -> Dict:
         print(f"❌ Errore caricamento config da {CONFIG_FILE}: {e}")
         sys.exit(1)
 
-def safe_print(msg: str):
-    """Print sicuro per Windows e Unicode"""
-    try:
-        print(msg)
-    except UnicodeEncodeError:
-        ascii_msg = msg.encode('ascii', 'replace').decode('ascii')
-        print(ascii_msg)
+if hasattr(sys.stdout, "reconfigure"):
+    # Una sola configurazione all'avvio: i caratteri non codificabili (emoji su console cp1252)
+    # diventano '?' direttamente nello stream, senza try/except a ogni print
+    sys.stdout.reconfigure(errors="replace")
+    safe_print = print
+else:
+    def safe_print(msg: str):
+        """Print sicuro per Windows e Unicode"""
+        try:
+            print(msg)
+        except UnicodeEncodeError:
+            ascii_msg = msg.encode('ascii', 'replace').decode('ascii')
+            print(ascii_msg)
 
-def calculate_file_hash(file_path: pathlib.Path) -> str:
-    """Calcola hash SHA-256 del file per maggiore sicurezza"""
+def calculate_file_hash(file_path: pathlib.Path, algorithm: str = "sha256") -> str:
+    """Calcola hash del file (default SHA-256 per maggiore sicurezza)"""
     try:
-        hash_sha256 = hashlib.sha256()
-        with open(file_path, "rb") as f:
-            for chunk in iter(lambda: f.read(4096), b""):
-                hash_sha256.update(chunk)
-        return hash_sha256.hexdigest()
+        # buffering=0: file_digest e readinto leggono direttamente nel proprio buffer, senza doppia copia
+        with open(file_path, "rb", buffering=0) as f:
+            if _HAS_FILE_DIGEST:
+                # Python 3.11+: loop interamente in C (OpenSSL, SHA-NI dove disponibile)
+                return hashlib.file_digest(f, algorithm).hexdigest()
+            
+            hasher = hashlib.new(algorithm)
+            buffer = bytearray(HASH_BUFFER_SIZE)
+            view = memoryview(buffer)
+            while n := f.readinto(buffer):
+                hasher.update(view[:n])
+            return hasher.hexdigest()
     except Exception:
         return "unknown"
 
+class HashingReader:
+    """File wrapper che aggiorna l'hash mentre l'upload legge i byte (una sola lettura dal disco)"""
+    
+    def __init__(self, f, hasher):
+        self.f = f
+        self.hasher = hasher
+        self._hashed = 0  # Byte già passati nell'hash: i retry resumable rileggono senza contarli due volte
+    
+    def read(self, size: int = -1) -> bytes:
+        pos = self.f.tell()
+        data = self.f.read(size)
+        end = pos + len(data)
+        if end > self._hashed:
+            self.hasher.update(memoryview(data)[self._hashed - pos:])
+            self._hashed = end
+        return data
+    
+    def __getattr__(self, name):
+        # seek/tell/close ecc. vanno al file sottostante
+        return getattr(self.f, name)
+
+def file_digests(file_path: pathlib.Path, checksum: str = "md5") -> tuple:
+    """Digest confrontabile con GCS (md5Hash, oppure crc32c per gli oggetti multipart che non hanno MD5;
+    entrambi base64) e SHA-256 (hex) con una sola lettura del file"""
+    remote_hasher = google_crc32c.Checksum() if checksum == "crc32c" else hashlib.md5()
+    sha256 = hashlib.sha256()
+    with open(file_path, "rb", buffering=0) as f:
+        # bytes e non memoryview: google_crc32c accetta solo buffer read-only
+        while chunk := f.read(HASH_BUFFER_SIZE):
+            remote_hasher.update(chunk)
+            sha256.update(chunk)
+    return base64.b64encode(remote_hasher.digest()).decode("ascii"), sha256.hexdigest()
+
+def _match_segments(matchers: list, parts: List[str]) -> bool:
+    """Confronto segmento per segmento: "**" copre zero o più cartelle, come in glob"""
+    if not matchers:
+        return not parts
+    if matchers[0] is None:  # "**"
+        return any(_match_segments(matchers[1:], parts[i:]) for i in range(len(parts) + 1))
+    return bool(parts) and bool(matchers[0](parts[0])) and _match_segments(matchers[1:], parts[1:])
+
+def find_files(src: pathlib.Path, patterns: List[str]) -> Dict[str, List[pathlib.Path]]:
+    """Una sola visita ricorsiva (os.scandir) per tutti i pattern: pattern -> file trovati.
+    
+    Pattern senza "/" confrontati col solo nome file; con "/" (es. "sub/*.pdf", "**/x/*.json")
+    confrontati col percorso relativo a src, a qualunque profondità come faceva rglob"""
+    name_matchers = []
+    path_matchers = []
+    for pattern in patterns:
+        normalized = os.path.normcase(pattern).replace(os.sep, "/")
+        if "/" in normalized:
+            # rglob(p) equivale a glob("**/" + p)
+            segments = ["**"] + [seg for seg in normalized.split("/") if seg]
+            path_matchers.append((pattern, [None if seg == "**" else re.compile(fnmatch.translate(seg)).match
+                                            for seg in segments]))
+        else:
+            name_matchers.append((pattern, re.compile(fnmatch.translate(normalized)).match))
+    found: Dict[str, List[pathlib.Path]] = {pattern: [] for pattern in patterns}
+    root = str(src)
+    stack = [root]
+    while stack:
+        try:
+            entries = os.scandir(stack.pop())
+        except PermissionError:
+            continue  # Cartella non leggibile: saltata come faceva rglob
+        with entries:
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    stack.append(entry.path)
+                    continue
+                if not entry.is_file():
+                    continue  # Symlink a cartelle, link rotti, socket...
+                name = os.path.normcase(entry.name)
+                for pattern, match in name_matchers:
+                    if match(name):
+                        found[pattern].append(pathlib.Path(entry.path))
+                if path_matchers:
+                    parts = os.path.normcase(os.path.relpath(entry.path, root)).split(os.sep)
+                    for pattern, matchers in path_matchers:
+                        if _match_segments(matchers, parts):
+                            found[pattern].append(pathlib.Path(entry.path))
+    return found
+
+def dump_jsonl_line(record: Dict) -> bytes:
+    """Una riga di batch.jsonl (UTF-8, con newline): orjson se disponibile"""
+    if orjson:
+        return orjson.dumps(record, option=orjson.OPT_APPEND_NEWLINE)
+    return (json.dumps(record, ensure_ascii=False) + "\n").encode("utf-8")
+
+def load_manifest(directory: pathlib.Path) -> Dict[str, Dict]:
+    """Legge manifest.jsonl di una cartella: nome file -> metadata"""
+    manifest: Dict[str, Dict] = {}
+    manifest_path = directory / MANIFEST_NAME
+    if not manifest_path.exists():
+        return manifest
+    
+    try:
+        with open(manifest_path, "rb") as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                try:
+                    record = json_loads(line)
+                except json.JSONDecodeError:
+                    continue
+                file_name = record.pop("file", None)
+                if file_name:
+                    manifest[file_name] = record
+    except Exception as e:
+        safe_print(f"⚠️  Errore lettura manifest {manifest_path}: {e}")
+    return manifest
+
 def get_mime_type_for_source(file_path: pathlib.Path, source_name: str, config: Dict) -> str:
-    """Determina MIME type basandosi sui file_patterns della source nel config"""
-    
-    # Trova la source nel config
-    sources = config.get("sources", [])
-    source_config = None
-    for source in sources:
-        if source.get("name") == source_name:
-            source_config = source
-            break
-    
-    if not source_config:
-        # Fallback se source non trovata
-        extension = file_path.suffix.lower().lstrip('.')
-        return MIME_TYPE_MAPPING.get(extension, 'application/octet-stream')
-    
-    # Prendi file_patterns dal config della source
-    file_patterns = source_config.get("file_patterns", [])
-    file_extension = file_path.suffix.lower()  # es: ".pdf"
-    
-    # Controlla se l'estensione è supportata dai patterns
-    for pattern in file_patterns:
-        # pattern è tipo "*.pdf", "*.json"
-        pattern_ext = pattern.replace("*", "")  # ".pdf", ".json"
-        if file_extension == pattern_ext:
-            # Converti estensione in MIME type
-            clean_ext = pattern_ext.lstrip('.')  # "pdf", "json"
-            return MIME_TYPE_MAPPING.get(clean_ext, 'application/octet-stream')
-    
-    # Fallback se estensione non matchata
+    """Determina MIME type dall'estensione del file.
+    
+    Un pattern "*.ext" dei file_patterns della source combacia solo se l'estensione è proprio ".ext",
+    e in quel caso il MIME è comunque MIME_TYPE_MAPPING[ext]: la scansione di sources/file_patterns
+    per ogni record dava sempre lo stesso risultato del lookup diretto."""
     extension = file_path.suffix.lower().lstrip('.')
     return MIME_TYPE_MAPPING.get(extension, 'application/octet-stream')
 
-def create_structured_record(file_path: pathlib.Path, gcs_uri: str, metadata: Dict, config: Dict) -> Dict:
-    """Crea un record nel formato strutturato richiesto"""
+@functools.lru_cache(maxsize=4096)
+def _title_prefix(title_prefix: str, doc_type, legislatura, seduta) -> str:
+    """Parte del title condivisa da tutti i file della stessa seduta (memoizzata)"""
+    parts = (
+        title_prefix,
+        doc_type and doc_type.replace('_', ' ').title(),
+        legislatura and f"Legislatura {legislatura}",
+        seduta and f"Seduta {seduta}",
+    )
+    return ' - '.join(p for p in parts if p)
+
+def create_structured_record(file_path: pathlib.Path, gcs_uri: str, metadata: Dict, config: Dict, *,
+                             file_size: Optional[int] = None, file_hash: Optional[str] = None,
+                             uploaded_at: Optional[str] = None) -> Dict:
+    """Crea un record nel formato strutturato richiesto (file_size/file_hash: già noti dall'upload,
+    uploaded_at: timestamp unico del run)"""
     
     # ===== FIX CRITICO: Assicura che file_path sia Path object =====
     file_path = pathlib.Path(file_path)
@@ -131,49 +289,36 @@ def create_structured_record(file_path: pathlib.Path, gcs_uri: str, metadata: Di
     # Inferisci source type e title dal campo 'source' che viene dal config name!
     source_key = metadata.get('source', 'unknown')
     
-    # Source type inference dal name del config
-    if source_key == 'camera':
-        source_type = 'parliamentary_records_camera'
-        title_prefix = 'Camera dei Deputati'
-    elif source_key == 'senato':
-        source_type = 'parliamentary_records_senato'
-        title_prefix = 'Senato della Repubblica'
-    elif 'youtube' in source_key:
-        source_type = 'video_transcripts'
-        title_prefix = 'YouTube'
-    else:
-        source_type = 'parliamentary_records'
-        title_prefix = None
-    
-    # Costruisce title intelligente
-    title_parts = []
-    if title_prefix:
-        title_parts.append(title_prefix)
+    # Source type inference dal name del config (tabella a livello modulo)
+    source_info = SOURCE_TYPES.get(source_key)
+    if source_info is None:
+        source_info = YOUTUBE_SOURCE_TYPE if 'youtube' in source_key else DEFAULT_SOURCE_TYPE
+    source_type, title_prefix = source_info
     
-    if metadata.get('document_type'):
-        doc_type = metadata['document_type'].replace('_', ' ').title()
-        title_parts.append(doc_type)
+    # Costruisce title intelligente: prefisso per seduta dalla cache, data per singolo file
+    key = (title_prefix, metadata.get('document_type'), metadata.get('legislatura'), metadata.get('seduta'))
+    try:
+        prefix = _title_prefix(*key)
+    except TypeError:
+        prefix = _title_prefix.__wrapped__(*key)  # Valori non hashable (es. liste dal JSON)
     
-    if metadata.get('legislatura'):
-        title_parts.append(f"Legislatura {metadata['legislatura']}")
-        
-    if metadata.get('seduta'):
-        title_parts.append(f"Seduta {metadata['seduta']}")
-        
-    if metadata.get('date'):
+    date = metadata.get('date')
+    if date:
         try:
             # Formatta la data in modo leggibile
-            date_obj = dt.datetime.fromisoformat(metadata['date']).date()
-            formatted_date = date_obj.strftime("%d/%m/%Y")
-            title_parts.append(formatted_date)
-        except:
-            title_parts.append(metadata['date'])
+            date = dt.datetime.fromisoformat(date).date().strftime("%d/%m/%Y")
+        except (TypeError, ValueError):
+            pass
     
-    title = ' - '.join(title_parts) if title_parts else filename
+    title = ' - '.join(p for p in (prefix, date) if p) or filename
     
-    # Calcola file size e hash SHA-256
-    file_size = file_path.stat().st_size if file_path.exists() else 0
-    file_hash = calculate_file_hash(file_path) if file_path.exists() else "unknown"
+    # File size e hash SHA-256: calcolati qui solo se il chiamante non li conosce già
+    if file_size is None or file_hash is None:
+        exists = file_path.exists()
+        if file_size is None:
+            file_size = file_path.stat().st_size if exists else 0
+        if file_hash is None:
+            file_hash = calculate_file_hash(file_path) if exists else "unknown"
     
     # Struttura finale migliorata con SHA-256
     record = {
@@ -189,27 +334,118 @@ def create_structured_record(file_path: pathlib.Path, gcs_uri: str, metadata: Di
             "fileSize": file_size,
             "fileHash": file_hash,  # 🔒 Ora usa SHA-256
             "hashAlgorithm": HASH_ALGORITHM,  # 🆕 Dal CONFIG
-            "uploadedAt": dt.datetime.now(dt.timezone.utc).isoformat(),
-            **{k: v for k, v in metadata.items() if k not in ['source', 'document_type', 'language']}
+            "uploadedAt": uploaded_at or dt.datetime.now(dt.timezone.utc).isoformat(),
         }
     }
     
+    # Metadata extra copiati direttamente (sovrascrivono i campi sopra come faceva lo splat)
+    struct_data = record["structData"]
+    for key, value in metadata.items():
+        if key not in _STRUCT_EXCLUDED_KEYS:
+            struct_data[key] = value
+    
     return record
 
 def backup_existing_batch(bucket: storage.Bucket, batch_blob_name: str) -> Optional[str]:
     """Crea backup del batch esistente"""
     try:
         batch_blob = bucket.blob(batch_blob_name)
-        if batch_blob.exists():
-            timestamp = dt.datetime.now(dt.timezone.utc).strftime("%Y%m%dT%H%M%S")
-            backup_name = f"{batch_blob_name}.{timestamp}.bak"
-            bucket.copy_blob(batch_blob, bucket, new_name=backup_name)
-            safe_print(f"📋 Backup creato: {backup_name}")
-            return backup_name
+        timestamp = dt.datetime.now(dt.timezone.utc).strftime("%Y%m%dT%H%M%S")
+        backup_name = f"{batch_blob_name}.{timestamp}.bak"
+        # Copia diretta lato server, senza exists() prima: se il batch non c'è, NotFound
+        bucket.copy_blob(batch_blob, bucket, new_name=backup_name)
+        safe_print(f"📋 Backup creato: {backup_name}")
+        return backup_name
+    except exceptions.NotFound:
+        pass  # Primo caricamento: niente da salvare
     except Exception as e:
         safe_print(f"⚠️  Errore durante backup: {e}")
     return None
 
+def upload_single_file(bucket: storage.Bucket, bucket_name: str, data_file: pathlib.Path,
+                       src: pathlib.Path, prefix: str, config: Dict,
+                       manifests: Dict[pathlib.Path, Dict[str, Dict]], manifests_lock: Lock,
+                       existing_blobs: Dict[str, tuple], uploaded_at: str) -> tuple:
+    """Carica un file con il suo metadata (eseguito nei worker).
+    Restituisce (record per batch.jsonl, True se caricato / False se già identico su GCS)"""
+    # ===== FIX CRITICO: Path handling sicuro =====
+    data_file = pathlib.Path(data_file)  # Assicura Path object
+    
+    # Componenti del path derivati una volta sola (pathlib ri-divide la stringa a ogni accesso)
+    name = data_file.name
+    parent = data_file.parent
+    content_type = mimetypes.guess_type(name)[0]
+    
+    relative_path = data_file.relative_to(src).as_posix()
+    gcs_path = f"{prefix}/{relative_path}".lstrip("/")
+    gcs_uri = f"gs://{bucket_name}/{gcs_path}"
+    
+    file_size = data_file.stat().st_size
+    file_hash = None
+    crc32c = None
+    
+    # Stessa dimensione su GCS: confronta l'MD5 prima di ricaricare; gli oggetti caricati
+    # a chunk paralleli (XML multipart) non hanno md5Hash, per loro si confronta il CRC32C
+    remote = existing_blobs.get(gcs_path)
+    if remote and remote[0] == file_size and (remote[1] or remote[2]):
+        remote_digest = remote[1] or remote[2]
+        local_digest, sha256_hex = file_digests(data_file, "md5" if remote[1] else "crc32c")
+        if local_digest == remote_digest:
+            file_hash = sha256_hex
+            crc32c = remote[2]
+    
+    uploaded = file_hash is None
+    if uploaded and transfer_manager and file_size > PARALLEL_UPLOAD_THRESHOLD:
+        # File grandi: chunk da 32 MiB caricati in parallelo (XML multipart) e riassemblati da GCS
+        blob = bucket.blob(gcs_path)
+        blob.content_type = content_type
+        # I chunk sono letti dai thread del transfer_manager: lo SHA-256 va in parallelo all'upload
+        # (stesse pagine in page cache) invece di una seconda lettura completa a upload finito
+        with ThreadPoolExecutor(max_workers=1) as hash_pool:
+            hash_future = hash_pool.submit(calculate_file_hash, data_file)
+            transfer_manager.upload_chunks_concurrently(
+                str(data_file), blob, chunk_size=PARALLEL_CHUNK_SIZE,
+                max_workers=PARALLEL_CHUNK_WORKERS, worker_type=transfer_manager.THREAD)
+            blob.reload()  # crc32c calcolato da GCS sull'oggetto finale
+            file_hash = hash_future.result()
+        crc32c = blob.crc32c
+    elif uploaded:
+        # Upload file calcolando l'hash SHA-256 sugli stessi byte inviati;
+        # CRC32C (hardware, google-crc32c) verificato dalla libreria contro quello calcolato da GCS
+        blob = bucket.blob(gcs_path)
+        hasher = hashlib.sha256()
+        with open(data_file, "rb") as f:
+            blob.upload_from_file(HashingReader(f, hasher), size=file_size,
+                                  content_type=content_type,
+                                  checksum="crc32c")
+        file_hash = hasher.hexdigest()
+        crc32c = blob.crc32c
+    
+    # Leggi metadata sidecar
+    sidecar_path = data_file.with_suffix(".json")
+    metadata: Dict = {}
+    try:
+        # Una sola open, niente exists() separato; bytes UTF-8 direttamente al parser
+        metadata = json_loads(sidecar_path.read_bytes())
+    except FileNotFoundError:
+        # Fallback: manifest.jsonl della cartella (es. Senato), letto una volta sola
+        with manifests_lock:
+            if parent not in manifests:
+                manifests[parent] = load_manifest(parent)
+        metadata = dict(manifests[parent].get(name, {}))
+    except (OSError, ValueError) as e:  # ValueError copre JSONDecodeError (json e orjson) e UnicodeDecodeError
+        safe_print(f"⚠️  Errore lettura metadata {sidecar_path.name}: {e}")
+    if not isinstance(metadata, dict):
+        safe_print(f"⚠️  Metadata {sidecar_path.name} non è un oggetto JSON, ignorato")
+        metadata = {}
+    
+    # Crea record strutturato leggendo MIME type dai file_patterns del config
+    record = create_structured_record(data_file, gcs_uri, metadata, config,
+                                      file_size=file_size, file_hash=file_hash, uploaded_at=uploaded_at)
+    if crc32c:
+        record["structData"]["crc32c"] = crc32c  # Base64, stesso formato dell'oggetto GCS
+    return record, uploaded
+
 def upload_directory(src: pathlib.Path, bucket_name: str, prefix: str, patterns: List[str], refresh: bool):
     """Upload con formato strutturato e gestione errori migliorata"""
     
@@ -225,17 +461,12 @@ def upload_directory(src: pathlib.Path, bucket_name: str, prefix: str, patterns:
     safe_print(f"👥 Max workers: {MAX_WORKERS}")
     
     # Controllo sicurezza path
-    src_str = str(src)
-    problematic_patterns = [
-        "downloadscamera", "downloadsenato", "camera2025", "senato2025"
-    ]
-    
-    for pattern in problematic_patterns:
-        if pattern in src_str.lower():
-            error_msg = f"❌ SOURCE PATH MALFORMATO: '{src}' contiene '{pattern}'"
-            safe_print(error_msg)
-            safe_print("   💡 Questo indica problemi di concatenazione path!")
-            sys.exit(1)
+    match = _PROBLEMATIC_PATH_RE.search(str(src).lower())
+    if match:
+        error_msg = f"❌ SOURCE PATH MALFORMATO: '{src}' contiene '{match.group(0)}'"
+        safe_print(error_msg)
+        safe_print("   💡 Questo indica problemi di concatenazione path!")
+        sys.exit(1)
     
     safe_print("🔧 Inizializzazione client GCS...")
     safe_print(f"🔒 Utilizzando hash {HASH_ALGORITHM} per integrità file")
@@ -248,10 +479,14 @@ def upload_directory(src: pathlib.Path, bucket_name: str, prefix: str, patterns:
             client = storage.Client()
             safe_print("🔑 Usando credenziali di default")
         
+        # Pool keep-alive (default requests: 10 connessioni per host). Il transfer_manager usa la stessa
+        # sessione: con più file grandi insieme ogni worker apre fino a PARALLEL_CHUNK_WORKERS connessioni.
+        # Le connessioni nascono solo quando servono, un limite alto non costa nulla
+        adapter = HTTPAdapter(pool_connections=MAX_WORKERS, pool_maxsize=MAX_WORKERS * PARALLEL_CHUNK_WORKERS)
+        client._http.mount("https://", adapter)
+        
+        # Nessuna richiesta di test: la connessione si verifica con il primo list_blobs utile
         bucket = client.bucket(bucket_name)
-        # Test connessione
-        bucket.reload()
-        safe_print(f"✅ Connesso al bucket: {bucket_name}")
         
     except Exception as e:
         safe_print(f"❌ ERRORE GCS: {e}")
@@ -265,24 +500,46 @@ def upload_directory(src: pathlib.Path, bucket_name: str, prefix: str, patterns:
     if refresh:
         safe_print("🧹 PULIZIA bucket...")
         try:
-            blobs_to_delete = list(client.list_blobs(bucket_name, prefix=prefix))
-            if blobs_to_delete:
-                for blob in tqdm(blobs_to_delete, desc="Pulizia"):
+            # Listing letto a pagine mentre si elimina: nessuna lista completa in memoria
+            blobs_to_delete = iter(client.list_blobs(bucket_name, prefix=prefix, fields="items(name),nextPageToken"))
+            deleted = 0
+            with tqdm(desc="Pulizia", unit="file") as progress:
+                # Batch da 100 DELETE in una sola richiesta HTTP (limite GCS)
+                while chunk := list(islice(blobs_to_delete, DELETE_BATCH_SIZE)):
                     try:
-                        blob.delete()
+                        with client.batch():
+                            for blob in chunk:
+                                blob.delete()
+                    except exceptions.NotFound:
+                        pass  # Già eliminato (es. run concorrente): il resto del batch è andato
                     except Exception as e:
-                        safe_print(f"⚠️  Errore eliminazione {blob.name}: {e}")
-                safe_print(f"🧹 Eliminati {len(blobs_to_delete)} file esistenti")
+                        safe_print(f"⚠️  Errore eliminazione batch ({chunk[0].name}...): {e}")
+                    deleted += len(chunk)
+                    progress.update(len(chunk))
+            if deleted:
+                safe_print(f"🧹 Eliminati {deleted} file esistenti")
             else:
                 safe_print("🧹 Nessun file da eliminare")
         except Exception as e:
             safe_print(f"⚠️  Errore durante pulizia: {e}")
     
+    # Oggetti già presenti (nome -> dimensione, md5, crc32c) per saltare i file invariati
+    # (dopo un refresh è quasi vuoto ma fa comunque da verifica di accesso al bucket)
+    existing_blobs: Dict[str, tuple] = {}
+    try:
+        for blob in client.list_blobs(bucket_name, prefix=prefix,
+                                      fields="items(name,size,md5Hash,crc32c),nextPageToken"):
+            existing_blobs[blob.name] = (blob.size, blob.md5_hash, blob.crc32c)
+        safe_print(f"✅ Connesso al bucket: {bucket_name}")
+        safe_print(f"☁️  Oggetti già presenti nel bucket: {len(existing_blobs)}")
+    except Exception as e:
+        safe_print(f"❌ ERRORE GCS: {e}")
+        sys.exit(1)
+    
     # Trova tutti i file
     safe_print(f"🔍 Ricerca file con pattern: {', '.join(patterns)}")
     all_files: Set[pathlib.Path] = set()
-    for pattern in patterns:
-        found_files = list(src.rglob(pattern))
+    for pattern, found_files in find_files(src, patterns).items():
         all_files.update(found_files)
         safe_print(f"  📄 {pattern}: {len(found_files)} file")
     
@@ -294,40 +551,35 @@ def upload_directory(src: pathlib.Path, bucket_name: str, prefix: str, patterns:
     
     safe_print(f"📤 Upload di {len(data_files)} file con hash SHA-256...")
     
-    jsonl_records: List[Dict] = []
+    record_count = 0
     upload_errors = []
-    
-    for data_file in tqdm(data_files, desc="Upload"):
-        try:
-            # ===== FIX CRITICO: Path handling sicuro =====
-            data_file = pathlib.Path(data_file)  # Assicura Path object
-            
-            relative_path = str(data_file.relative_to(src)).replace("\\", "/")
-            gcs_path = f"{prefix}/{relative_path}".lstrip("/")
-            gcs_uri = f"gs://{bucket_name}/{gcs_path}"
-            
-            # Upload file
-            blob = bucket.blob(gcs_path)
-            blob.upload_from_filename(str(data_file))
-            
-            # Leggi metadata sidecar
-            sidecar_path = data_file.with_suffix(".json")
-            metadata: Dict = {}
-            if sidecar_path.exists():
-                try:
-                    with open(sidecar_path, "r", encoding="utf-8") as f:
-                        metadata = json.load(f)
-                except Exception as e:
-                    safe_print(f"⚠️  Errore lettura metadata {sidecar_path.name}: {e}")
-            
-            # Crea record strutturato leggendo MIME type dai file_patterns del config
-            record = create_structured_record(data_file, gcs_uri, metadata, config)
-            jsonl_records.append(record)
-            
-        except Exception as e:
-            error_msg = f"Errore upload {data_file.name}: {e}"
-            safe_print(f"❌ {error_msg}")
-            upload_errors.append(error_msg)
+    manifests: Dict[pathlib.Path, Dict[str, Dict]] = {}
+    manifests_lock = Lock()
+    unchanged = 0
+    uploaded_at = dt.datetime.now(dt.timezone.utc).isoformat()  # Stesso timestamp per tutti i record del run
+    
+    # I record vanno nel buffer man mano che i worker finiscono (scrive solo il thread principale,
+    # niente lock): in memoria per i batch tipici, riversato su disco solo oltre JSONL_SPOOL_SIZE
+    tmp = tempfile.SpooledTemporaryFile(max_size=JSONL_SPOOL_SIZE, mode="w+b", buffering=JSONL_BUFFER_SIZE)
+    
+    # Upload paralleli: ogni PUT è I/O bloccante (GIL rilasciato), il client GCS è thread-safe
+    with ThreadPoolExecutor(max_workers=MAX_WORKERS) as pool:
+        futures = {
+            pool.submit(upload_single_file, bucket, bucket_name, data_file, src, prefix,
+                        config, manifests, manifests_lock, existing_blobs, uploaded_at): data_file
+            for data_file in data_files
+        }
+        for future in tqdm(as_completed(futures), total=len(futures), desc="Upload"):
+            try:
+                record, uploaded = future.result()
+                tmp.write(dump_jsonl_line(record))
+                record_count += 1
+                if not uploaded:
+                    unchanged += 1
+            except Exception as e:
+                error_msg = f"Errore upload {futures[future].name}: {e}"
+                safe_print(f"❌ {error_msg}")
+                upload_errors.append(error_msg)
     
     # Report errori
     if upload_errors:
@@ -344,15 +596,10 @@ def upload_directory(src: pathlib.Path, bucket_name: str, prefix: str, patterns:
     # Backup se esiste
     backup_existing_batch(bucket, batch_blob_name)
     
-    # Scrivi nuovo file
+    # Carica il buffer già scritto durante l'upload
     try:
-        with tempfile.NamedTemporaryFile("w+", delete=False, encoding="utf-8") as tmp:
-            for record in jsonl_records:
-                tmp.write(json.dumps(record, ensure_ascii=False) + "\n")
-            tmp_path = pathlib.Path(tmp.name)
-        
         batch_blob = bucket.blob(batch_blob_name)
-        batch_blob.upload_from_filename(str(tmp_path), content_type="application/json")
+        batch_blob.upload_from_file(tmp, rewind=True, size=tmp.tell(), content_type="application/json")
         
         safe_print(f"✅ SUCCESS: batch.jsonl caricato in gs://{bucket_name}/{batch_blob_name}")
         safe_print(f"🔒 Tutti i file ora hanno hash {HASH_ALGORITHM} per maggiore sicurezza")
@@ -360,15 +607,15 @@ def upload_directory(src: pathlib.Path, bucket_name: str, prefix: str, patterns:
     except Exception as e:
         safe_print(f"❌ ERRORE creazione batch.jsonl: {e}")
     finally:
-        if 'tmp_path' in locals():
-            tmp_path.unlink(missing_ok=True)
+        tmp.close()
     
     # Summary finale
     successful_uploads = len(data_files) - len(upload_errors)
     safe_print(f"\n🎯 SUMMARY:")
-    safe_print(f"   ✅ File caricati: {successful_uploads}")
+    safe_print(f"   ✅ File caricati: {successful_uploads - unchanged}")
+    safe_print(f"   ⏭️  Invariati (non ricaricati): {unchanged}")
     safe_print(f"   ❌ Errori: {len(upload_errors)}")
-    safe_print(f"   📊 Record batch: {len(jsonl_records)}")
+    safe_print(f"   📊 Record batch: {record_count}")
     safe_print(f"   🔒 Hash algorithm: {HASH_ALGORITHM}")
 
 def main():